@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date, datetime
-from collections import defaultdict
 
 from backend.schemas import schemas
 from backend.core.database import get_db
@@ -37,7 +37,11 @@ def create_day_off_request(
         raise HTTPException(status_code=400, detail="Day-off request already exists for this date")
 
     db_req = crud_request.create_request(db, req.staff_id, req.request_date, req.reason)
-    crud_request.commit_and_refresh(db, db_req)
+    try:
+        crud_request.commit_and_refresh(db, db_req)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Day-off request already exists for this date")
 
     result = schemas.RequestedDayOff.model_validate(db_req)
     result.staff_name = staff.name
@@ -57,24 +61,25 @@ def create_bulk_day_off_requests(
     if not staff:
         raise HTTPException(status_code=404, detail="Staff not found")
 
-    created_requests = []
-    for request_date in req.request_dates:
-        if request_date < date.today():
-            continue
-        existing = crud_request.get_duplicate_request(db, req.staff_id, request_date)
-        if existing:
-            continue
-        db_req = crud_request.create_request(db, req.staff_id, request_date, req.reason)
-        created_requests.append(db_req)
-
-    db.commit()
-
-    results = []
-    for db_req in created_requests:
-        db.refresh(db_req)
-        result = schemas.RequestedDayOff.model_validate(db_req)
-        result.staff_name = staff.name
-        results.append(result)
+    today = date.today()
+    request_dates = sorted({d for d in req.request_dates if d >= today})
+    existing = crud_request.get_existing_request_dates(db, req.staff_id, request_dates)
+    new_dates = [d for d in request_dates if d not in existing]
+    if not new_dates:
+        return []
+
+    try:
+        created_requests = crud_request.create_requests(db, req.staff_id, new_dates, req.reason)
+        results = []
+        for db_req in created_requests:
+            result = schemas.RequestedDayOff.model_validate(db_req)
+            result.staff_name = staff.name
+            results.append(result)
+        db.commit()
+    except IntegrityError:
+        # 同時に同じ日付が申請された場合
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Day-off request already exists for this date")
 
     return results
 
@@ -118,11 +123,10 @@ def get_all_staff_day_off_calendar(
 
     results = []
     for req in requests:
-        staff = crud_request.get_staff_by_id(db, req.staff_id)
         results.append(schemas.RequestedDayOffCalendarItem(
             id=req.id,
             staff_id=req.staff_id,
-            staff_name=staff.name if staff else "Unknown",
+            staff_name=req.staff.name if req.staff else "Unknown",
             request_date=req.request_date,
             status=req.status,
         ))
@@ -213,9 +217,8 @@ def get_all_day_off_requests(
 
     results = []
     for req in requests:
-        staff = crud_request.get_staff_by_id(db, req.staff_id)
         result = schemas.RequestedDayOff.model_validate(req)
-        result.staff_name = staff.name if staff else "Unknown"
+        result.staff_name = req.staff.name if req.staff else "Unknown"
         results.append(result)
 
     return results
@@ -309,27 +312,49 @@ def bulk_approve_day_off_requests(
 ):
     """Approve multiple day-off requests at once"""
     approved_by = approval.approved_by if approval else "管理者"
-    approved_count = 0
-    errors = []
-
-    for request_id in request_ids:
-        db_req = crud_request.get_request_by_id(db, request_id)
-        if not db_req:
-            errors.append(f"Request {request_id} not found")
-            continue
-        if db_req.status != "pending":
-            errors.append(f"Request {request_id} is not pending")
-            continue
-        db_req.status = "approved"
-        db_req.approved_at = datetime.utcnow()
-        db_req.approved_by = approved_by
-        db_req.updated_at = datetime.utcnow()
-        approved_count += 1
-
+    approved_ids = crud_request.bulk_update_status(db, request_ids, "approved", acted_by=approved_by)
     db.commit()
+    approved_count = len(approved_ids)
     return {"message": f"Approved {approved_count} requests", "approved_count": approved_count}
 
 
+@router.put("/admin/requested-days-off/bulk-status", response_model=schemas.RequestedDayOffBulkStatusResult)
+def bulk_update_day_off_status(
+    body: schemas.RequestedDayOffBulkStatusUpdate,
+    db: Session = Depends(get_db),
+    _=Depends(get_current_admin),
+):
+    """複数の申請を一括で承認・却下・承認待ちに戻す
+
+    承認・却下は承認待ちの申請だけ、承認待ちへの差し戻しは承認済み・却下済みの申請だけが対象。
+    対象外の申請は理由とともに skipped に返す。件数によらず UPDATE 1回と状態確認1回で済む。
+    """
+    status = body.status.value
+    if status == "rejected" and not body.rejection_reason:
+        raise HTTPException(status_code=400, detail="rejection_reason is required to reject requests")
+
+    request_ids = list(dict.fromkeys(body.request_ids))
+    updated_ids = crud_request.bulk_update_status(
+        db, request_ids, status, acted_by=body.acted_by, rejection_reason=body.rejection_reason,
+    )
+    db.commit()
+
+    updated = set(updated_ids)
+    skipped_ids = [i for i in request_ids if i not in updated]
+    current = crud_request.get_request_statuses(db, skipped_ids)
+    skipped = [
+        schemas.RequestedDayOffBulkSkip(id=i, reason="not_found")
+        if i not in current else
+        schemas.RequestedDayOffBulkSkip(id=i, reason="invalid_transition", current_status=current[i])
+        for i in skipped_ids
+    ]
+    return schemas.RequestedDayOffBulkStatusResult(
+        status=body.status,
+        updated_ids=[i for i in request_ids if i in updated],
+        skipped=skipped,
+    )
+
+
 @router.get("/admin/requested-days-off/calendar", response_model=List[schemas.RequestedDayOffCalendarItem])
 def get_admin_day_off_calendar(
     year: int = Query(..., description="Year"),
@@ -346,11 +371,10 @@ def get_admin_day_off_calendar(
 
     results = []
     for req in requests:
-        staff = crud_request.get_staff_by_id(db, req.staff_id)
         results.append(schemas.RequestedDayOffCalendarItem(
             id=req.id,
             staff_id=req.staff_id,
-            staff_name=staff.name if staff else "Unknown",
+            staff_name=req.staff.name if req.staff else "Unknown",
             request_date=req.request_date,
             status=req.status,
         ))
@@ -366,30 +390,17 @@ def get_day_off_statistics(
     _=Depends(get_current_admin),
 ):
     """Get day-off statistics per day for the month (for admin calendar warnings)"""
-    requests = crud_request.get_statistics_requests(db, year, month)
-
-    date_stats = defaultdict(lambda: {"total": 0, "approved": 0, "pending": 0, "staff_names": []})
-
-    for req in requests:
-        staff = crud_request.get_staff_by_id(db, req.staff_id)
-        staff_name = staff.name if staff else "Unknown"
-
-        stats = date_stats[req.request_date]
-        stats["total"] += 1
-        if req.status == "approved":
-            stats["approved"] += 1
-        else:
-            stats["pending"] += 1
-        stats["staff_names"].append(staff_name)
+    rows = crud_request.get_day_off_statistics(db, year, month)
 
     results = []
-    for req_date, stats in sorted(date_stats.items()):
+    for row in rows:
         results.append(schemas.RequestedDayOffStatistics(
-            date=req_date,
-            total_requests=stats["total"],
-            approved_count=stats["approved"],
-            pending_count=stats["pending"],
-            staff_names=stats["staff_names"],
+            date=row.request_date,
+            total_requests=row.total,
+            approved_count=row.approved or 0,
+            pending_count=row.pending or 0,
+            # 連結順は DB 任せで不定なので、名前順に並べて返す
+            staff_names=sorted(row.staff_names.split(crud_request.STAFF_NAME_SEPARATOR)) if row.staff_names else [],
         ))
 
     return results
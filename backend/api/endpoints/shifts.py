@@ -1,13 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+import datetime
+import io
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi.responses import FileResponse, JSONResponse, Response
+from openpyxl.utils.exceptions import InvalidFileException
 from sqlalchemy.orm import Session
 from typing import List
+from zipfile import BadZipFile
 
 from backend.schemas import schemas
-from backend.core.database import get_db
+from backend.core.config import settings
+from backend.core.database import get_db, SessionLocal
 from backend.core.logging import get_logger
-from backend.crud import crud_shift
+from backend.crud import crud_schedule, crud_shift, crud_staff, crud_task
 from backend.solver import engine as shift_solver
-from backend.core.auth import get_current_admin
+from backend.solver.cache import schedule_cache, compute_input_hash, CachedSchedule
+from backend.solver.exporter import (
+    ShiftSheet, create_excel_file, extract_shift_data, extract_compact_shift_data, is_compact_shift_data,
+    write_shift_workbook,
+)
+from backend.solver.hints import (
+    hint_store, assignments_from_matrix, assignments_from_shift_data, assignments_to_matrix,
+    read_excel_assignments,
+)
+from backend.solver.jobs import job_manager, JobError
+from backend.solver.precheck import check_feasibility
+from backend.solver.repair import repair_schedule
+from backend.core.auth import get_current_admin, get_current_user
 
 logger = get_logger(__name__)
 
@@ -22,9 +42,6 @@ def read_absences(db: Session = Depends(get_db)):
 
 @router.post("/absence", response_model=schemas.AbsenceRequest)
 def create_absence(req: schemas.AbsenceRequestCreate, db: Session = Depends(get_db)):
-    existing = crud_shift.get_absence_duplicate(db, req.staff_id, req.date)
-    if existing:
-        return existing
     return crud_shift.create_absence(db, req)
 
 
@@ -43,13 +60,60 @@ def read_requirements(db: Session = Depends(get_db)):
     return crud_shift.get_requirements(db)
 
 
+@router.get("/requirements/effective", response_model=List[schemas.EffectiveRequirement])
+def read_effective_requirements(year: int, month: int, db: Session = Depends(get_db)):
+    """対象月の各日・業務の必要人数（曜日ごとの定型を展開し、日付指定の日次要件で上書きしたもの）"""
+    return crud_shift.get_effective_requirements(db, year, month)
+
+
 @router.post("/requirements", response_model=schemas.DailyRequirement)
 def create_or_update_requirement(req: schemas.DailyRequirementCreate, db: Session = Depends(get_db)):
-    existing = crud_shift.get_requirement_by_date_task(db, req.date, req.task_id)
-    if existing:
-        return crud_shift.update_requirement(db, existing, req.count)
+    return crud_shift.upsert_requirement(db, req)
+
+
+@router.put("/requirements/month", response_model=schemas.DailyRequirementMonthResult)
+def upsert_month_requirements(req: schemas.DailyRequirementMonthUpsert, db: Session = Depends(get_db)):
+    """1か月分の日次要件を、日×業務の行列または曜日ごとの定型から1回の upsert で登録・更新する"""
+    rows = req.matrix if req.matrix is not None else req.weekday_pattern
+    task_ids = {t.id for t in crud_task.get_tasks(db)}
+    unknown = sorted(set(rows) - task_ids)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"存在しない業務が含まれています: {unknown}")
+
+    if req.matrix is not None:
+        counts = {
+            (d, t_id): count
+            for t_id, day_counts in req.matrix.items()
+            for d, count in enumerate(day_counts, start=1)
+        }
     else:
-        return crud_shift.create_requirement(db, req)
+        counts = crud_shift.expand_weekday_pattern(req.weekday_pattern, req.year, req.month)
+
+    upserted = crud_shift.upsert_requirements(db, req.year, req.month, counts)
+    return schemas.DailyRequirementMonthResult(year=req.year, month=req.month, upserted=upserted)
+
+
+@router.get("/requirement-templates", response_model=List[schemas.RequirementTemplate])
+def read_requirement_templates(db: Session = Depends(get_db)):
+    return crud_shift.get_requirement_templates(db)
+
+
+@router.put("/requirement-templates", response_model=List[schemas.RequirementTemplate])
+def set_requirement_templates(req: schemas.RequirementTemplateUpsert, db: Session = Depends(get_db)):
+    """曜日ごとの必要人数の定型を設定する。シフト生成時に対象月へ展開され、日付指定の日次要件が優先される"""
+    task_ids = {t.id for t in crud_task.get_tasks(db)}
+    unknown = sorted(set(req.weekday_pattern) - task_ids)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"存在しない業務が含まれています: {unknown}")
+    crud_shift.set_requirement_templates(db, req.weekday_pattern)
+    return crud_shift.get_requirement_templates(db)
+
+
+@router.delete("/requirement-templates/{task_id}")
+def delete_requirement_templates(task_id: int, db: Session = Depends(get_db)):
+    if not crud_shift.delete_requirement_templates(db, task_id):
+        raise HTTPException(status_code=404, detail="Not found")
+    return {"message": "Deleted successfully"}
 
 # Holiday (施設休日)
 
@@ -60,14 +124,11 @@ def read_holidays(year: int, month: int, db: Session = Depends(get_db)):
 
 @router.post("/holidays", response_model=schemas.Holiday)
 def create_holiday(holiday: schemas.HolidayCreate, db: Session = Depends(get_db)):
-    existing = crud_shift.get_holiday_by_date(db, holiday.date)
-    if existing:
-        return existing
     return crud_shift.create_holiday(db, holiday)
 
 
 @router.delete("/holidays/{date}")
-def delete_holiday(date: str, db: Session = Depends(get_db)):
+def delete_holiday(date: datetime.date, db: Session = Depends(get_db)):
     db_holiday = crud_shift.delete_holiday(db, date)
     if not db_holiday:
         raise HTTPException(status_code=404, detail="Not found")
@@ -76,33 +137,322 @@ def delete_holiday(date: str, db: Session = Depends(get_db)):
 
 # Shift Generation
 
-@router.post("/generate-shift")
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def _schedule_download_url(schedule_id: str) -> str:
+    return f"/api/schedules/{schedule_id}/excel"
+
+
+# 入力ハッシュを持たない保存済みシフト（修復結果など）の schedule_id の接頭辞
+RUN_SCHEDULE_PREFIX = "run-"
+
+
+def _run_for_schedule(db: Session, schedule_id: str):
+    """schedule_id（入力ハッシュまたは run-<run_id>）に対応する保存済みシフトを返す"""
+    if schedule_id.startswith(RUN_SCHEDULE_PREFIX):
+        run_id = schedule_id[len(RUN_SCHEDULE_PREFIX):]
+        return crud_schedule.get_schedule_run(db, int(run_id)) if run_id.isdigit() else None
+    return crud_schedule.get_schedule_run_by_input_hash(db, schedule_id)
+
+
+def _register_schedule(schedule_id, year, month, staffs, tasks, matrix, shift_data, shortfalls=None) -> dict:
+    """求解結果をキャッシュに登録し、schedule_id と（初回アクセス時に Excel を作る）download_url を返す
+
+    キャッシュが無効で登録できない場合は、その場で Excel を作成して静的ファイルの URL を返す。
+    """
+    sheet = ShiftSheet(matrix, staffs, tasks, shift_solver.month_days(year, month), year, month)
+    if schedule_cache.put(schedule_id, CachedSchedule(year, month, shift_data, sheet, shortfalls)):
+        return {"schedule_id": schedule_id, "download_url": _schedule_download_url(schedule_id)}
+    excel_path = create_excel_file(sheet.matrix, sheet.staffs, sheet.tasks, sheet.days, year, month)
+    return {"schedule_id": None, "download_url": "/" + excel_path}
+
+
+def _shift_data_for(sheet: ShiftSheet, compact: bool) -> dict:
+    extract = extract_compact_shift_data if compact else extract_shift_data
+    return extract(sheet.matrix, sheet.staffs, sheet.tasks, sheet.days, sheet.year, sheet.month)
+
+
+def _run_generate_shift(job, year, month, input_hash, shift_input, solver_params, hints, options,
+                        compact=False) -> dict:
+    """ジョブとしてシフトを生成し、結果をキャッシュとウォームスタート用ヒントに登録する
+
+    解なしの場合は原因となった制約の組を conflicts として返す。
+    弾性モードでは満たせなかった要件を shortfalls として返す。
+    options は solve_shifts に渡す求解オプション（elastic, symmetry_breaking）。
+    compact=True なら shift_data をコンパクト形式で返す。
+    """
+    staffs, tasks, absences, requirements, holidays, additional_days = shift_input
+
+    result = shift_solver.solve_shifts(
+        staffs, tasks, requirements, absences, year, month, holidays,
+        additional_days=additional_days, solver_params=solver_params, solver=job.solver, hints=hints,
+        diagnose=not options["elastic"], write_excel=False, compact=compact,
+        should_stop=lambda: job.cancel_requested, **options,
+    )
+
+    if not result.feasible:
+        raise JobError(
+            "シフトを作成できませんでした。制約条件が厳しすぎるか、人が足りません。",
+            result={"conflicts": result.conflicts} if result.conflicts else None,
+        )
+    if job.cancel_requested:
+        return {"shift_data": result.shift_data, "shortfalls": result.shortfalls}
+    assignments = assignments_from_matrix(result.matrix, staffs, tasks, shift_solver.month_days(year, month))
+    # 要件を満たせなかった弾性モードの結果は下書きとして保存し、修復・ウォームスタートの元にしない
+    is_draft = bool(result.shortfalls)
+    if not is_draft:
+        hint_store.put(year, month, assignments)
+    # ジョブはリクエストのセッション終了後に走るため、専用のセッションで保存する
+    with SessionLocal() as db:
+        run = crud_schedule.create_schedule_run(db, year, month, assignments, "generate", input_hash, is_draft)
+    return {
+        "run_id": run.id,
+        **_register_schedule(
+            input_hash, year, month, staffs, tasks, result.matrix, result.shift_data, result.shortfalls,
+        ),
+        "shift_data": result.shift_data,
+        "shortfalls": result.shortfalls,
+    }
+
+
+@router.post("/generate-shift", response_model=schemas.ShiftJob, status_code=202)
 def generate_shift(req: schemas.GenerateRequest, db: Session = Depends(get_db)):
-    """指定された年月のシフトを自動生成し、ExcelのダウンロードURLを返す"""
-    logger.info("シフト生成開始: %d年%d月", req.year, req.month)
+    """指定された年月のシフト生成ジョブを登録し、ジョブIDを返す
+
+    入力が前回と同じ（入力ハッシュが一致する）場合は求解せず、
+    キャッシュ済みの結果を完了済みジョブとして即座に返す。
+    事前チェックで解がないと分かった場合は、不足している日・業務を issues に含めて 400 を返す。
+    """
+    cpu_count = os.cpu_count() or 1
+    if req.num_workers is not None and req.num_workers > cpu_count:
+        raise HTTPException(
+            status_code=400, detail=f"num_workers は CPU コア数（{cpu_count}）以下で指定してください",
+        )
 
-    staffs, tasks, absences, requirements, holidays = crud_shift.get_all_shift_data(db)
+    staffs, tasks, absences, requirements, holidays = crud_shift.get_month_shift_data(db, req.year, req.month)
 
     # 月間公休設定を取得
     rest_setting = crud_shift.get_monthly_rest_setting(db, req.year, req.month)
     additional_days = rest_setting.additional_days if rest_setting else None
 
-    excel_path, shift_data = shift_solver.generate_shift_excel(
-        staffs, tasks, requirements, absences, req.year, req.month, holidays,
-        additional_days=additional_days
+    solver_params = shift_solver.SolverParams(
+        time_limit_seconds=req.time_limit_seconds,
+        num_workers=req.num_workers,
+        relative_gap_limit=req.relative_gap_limit,
+        random_seed=req.random_seed,
+    ).resolved()
+
+    options = {
+        "elastic": req.elastic,
+        "symmetry_breaking": (
+            req.symmetry_breaking if req.symmetry_breaking is not None else settings.SOLVER_SYMMETRY_BREAKING
+        ),
+    }
+    input_hash = compute_input_hash(
+        staffs, tasks, requirements, absences, holidays, req.year, req.month,
+        additional_days=additional_days, solver_params=solver_params, options=options,
     )
+    cached = schedule_cache.get(input_hash)
+    if cached:
+        logger.info("シフト生成: キャッシュ済みの結果を返却 %d年%d月 (%s)", req.year, req.month, input_hash[:12])
+        run = crud_schedule.get_schedule_run_by_input_hash(db, input_hash)
+        job = job_manager.complete(req.year, req.month, {
+            "run_id": run.id if run else None,
+            "schedule_id": input_hash,
+            "download_url": _schedule_download_url(input_hash),
+            "shift_data": (
+                cached.shift_data if is_compact_shift_data(cached.shift_data) == req.compact
+                else _shift_data_for(cached.sheet, req.compact)
+            ),
+            "shortfalls": cached.shortfalls,
+            "cached": True,
+        })
+        return job.to_dict()
 
-    if excel_path:
-        download_url = "/" + excel_path
-        return {
-            "download_url": download_url,
-            "shift_data": shift_data,
-        }
-    else:
-        raise HTTPException(
-            status_code=400,
-            detail="シフトを作成できませんでした。制約条件が厳しすぎるか、人が足りません。",
+    # モデルを組む前に、明らかに解がない入力を検出して即座に返す（弾性モードでは不足を許すので省略）
+    issues = [] if req.elastic else check_feasibility(
+        staffs, tasks, requirements, req.year, req.month, shift_solver.month_days(req.year, req.month),
+        holidays=holidays, additional_days=additional_days,
+    )
+    if issues:
+        logger.info("シフト生成: 事前チェックで解なしと判定 %d年%d月 (%d件)", req.year, req.month, len(issues))
+        return JSONResponse(status_code=400, content={
+            "detail": "シフトを作成できません。" + " / ".join(i.message for i in issues[:3])
+                      + (f" ほか{len(issues) - 3}件" if len(issues) > 3 else ""),
+            "issues": [i.to_dict() for i in issues],
+        })
+
+    logger.info("シフト生成開始: %d年%d月", req.year, req.month)
+    shift_input = (staffs, tasks, absences, requirements, holidays, additional_days)
+    hints = None
+    if req.warm_start:
+        hints = hint_store.find(
+            req.year, req.month, load=lambda y, m: crud_schedule.get_latest_assignments(db, y, m),
         )
+    job = job_manager.submit(
+        req.year, req.month,
+        lambda job: _run_generate_shift(
+            job, req.year, req.month, input_hash, shift_input, solver_params, hints, options, req.compact,
+        ),
+    )
+    return job.to_dict()
+
+
+@router.post("/generate-shift/repair", response_model=schemas.ShiftRepairResult)
+def repair_shift(req: schemas.ShiftRepairRequest, db: Session = Depends(get_db)):
+    """現在のシフトを、休暇承認・要件変更のあった日の近傍だけ再最適化して修復する"""
+    base_assignments = (
+        hint_store.get(req.year, req.month) or crud_schedule.get_latest_assignments(db, req.year, req.month)
+    )
+    if not base_assignments:
+        raise HTTPException(status_code=404, detail="修復対象のシフトがありません。先にシフトを生成してください")
+
+    target_dates = [r.date for r in req.rest_requests] + list(req.changed_dates)
+    if not target_dates:
+        raise HTTPException(status_code=400, detail="変更内容を指定してください")
+    if any((d.year, d.month) != (req.year, req.month) for d in target_dates):
+        raise HTTPException(status_code=400, detail="対象月以外の日付が含まれています")
+
+    staffs, tasks, absences, requirements, holidays = crud_shift.get_month_shift_data(db, req.year, req.month)
+    rest_setting = crud_shift.get_monthly_rest_setting(db, req.year, req.month)
+    additional_days = rest_setting.additional_days if rest_setting else None
+
+    result = repair_schedule(
+        staffs, tasks, requirements, absences, req.year, req.month, base_assignments,
+        changed_days=[d.day for d in req.changed_dates],
+        forced_rest=[(r.staff_id, r.date.day) for r in req.rest_requests],
+        holidays=holidays, additional_days=additional_days, write_excel=False,
+    )
+    if result is None:
+        raise HTTPException(status_code=400, detail="この変更では制約を満たすシフトに修復できません")
+
+    download = {}
+    if not req.dry_run:
+        assignments = assignments_from_shift_data(result.shift_data)
+        hint_store.put(req.year, req.month, assignments)
+        run = crud_schedule.create_schedule_run(db, req.year, req.month, assignments, "repair")
+        download = {"run_id": run.id}
+        download.update(_register_schedule(
+            f"{RUN_SCHEDULE_PREFIX}{run.id}", req.year, req.month, staffs, tasks, result.matrix, result.shift_data,
+        ))
+    return {
+        **download,
+        "shift_data": result.shift_data,
+        "radius": result.radius,
+        "changed_cells": result.changed_cells,
+    }
+
+
+@router.post("/generate-shift/hints", response_model=schemas.ShiftHintUploadResult)
+def upload_shift_hints(
+    year: int,
+    month: int,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    _=Depends(get_current_admin),
+):
+    """確定済みのシフト表（Excel）をアップロードし、次回生成時のウォームスタートに使う（管理者のみ）"""
+    staffs = crud_staff.get_staffs(db, limit=None)
+    tasks = crud_task.get_tasks(db)
+    try:
+        assignments = read_excel_assignments(file.file, staffs, tasks)
+    except (InvalidFileException, BadZipFile, KeyError):
+        raise HTTPException(status_code=400, detail="Excelファイルを読み込めませんでした")
+    if not assignments:
+        raise HTTPException(status_code=400, detail="シフト表から割り当てを読み取れませんでした")
+
+    hint_store.put(year, month, assignments)
+    crud_schedule.create_schedule_run(db, year, month, assignments, "upload")
+    return {"year": year, "month": month, "assignment_count": len(assignments)}
+
+
+@router.get("/schedules/{schedule_id}/excel")
+def download_schedule_excel(schedule_id: str, db: Session = Depends(get_db)):
+    """生成済みシフトの Excel をダウンロード（初回アクセス時に作成し、以降は作成済みのファイルを返す）
+
+    キャッシュから外れた（期限切れ・再起動後の）場合は、保存済みシフトから Excel を作り直して返す。
+    """
+    excel_path = schedule_cache.excel_path(schedule_id)
+    if excel_path:
+        return FileResponse(excel_path, media_type=XLSX_MEDIA_TYPE, filename=os.path.basename(excel_path))
+
+    run = _run_for_schedule(db, schedule_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="シフトが見つかりません。期限切れの場合は再度生成してください")
+    staffs = crud_staff.get_staffs(db, limit=None)
+    tasks = crud_task.get_tasks(db)
+    days = shift_solver.month_days(run.year, run.month)
+    matrix = assignments_to_matrix(crud_schedule.get_run_assignments(db, run.id), staffs, tasks, days)
+    buffer = io.BytesIO()
+    write_shift_workbook(buffer, [ShiftSheet(matrix, staffs, tasks, days, run.year, run.month)])
+    filename = f"shift_{run.year}_{run.month}_{schedule_id[:16]}.xlsx"
+    return Response(
+        buffer.getvalue(), media_type=XLSX_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# Schedule Runs (保存済みシフト)
+
+def _schedule_run_detail(db: Session, run, compact=False) -> dict:
+    """保存済みシフトを、生成時と同じ形式の shift_data 付きで返す"""
+    staffs = crud_staff.get_staffs(db, limit=None)
+    tasks = crud_task.get_tasks(db)
+    days = shift_solver.month_days(run.year, run.month)
+    matrix = assignments_to_matrix(crud_schedule.get_run_assignments(db, run.id), staffs, tasks, days)
+    detail = schemas.ScheduleRun.model_validate(run).model_dump()
+    detail["shift_data"] = _shift_data_for(ShiftSheet(matrix, staffs, tasks, days, run.year, run.month), compact)
+    return detail
+
+
+@router.get("/schedule-runs", response_model=List[schemas.ScheduleRun])
+def read_schedule_runs(year: int, month: int, db: Session = Depends(get_db)):
+    """対象月の保存済みシフトの一覧（新しい順）"""
+    return crud_schedule.get_schedule_runs(db, year, month)
+
+
+@router.get("/schedule-runs/latest", response_model=schemas.ScheduleRunDetail)
+def read_latest_schedule_run(year: int, month: int, compact: bool = False, db: Session = Depends(get_db)):
+    """対象月の最新の保存済みシフト（求解せずに返す）"""
+    run = crud_schedule.get_latest_schedule_run(db, year, month)
+    if not run:
+        raise HTTPException(status_code=404, detail="保存済みのシフトがありません")
+    return _schedule_run_detail(db, run, compact)
+
+
+@router.get("/schedule-runs/{run_id}", response_model=schemas.ScheduleRunDetail)
+def read_schedule_run(run_id: int, compact: bool = False, db: Session = Depends(get_db)):
+    """保存済みシフトを取得（求解せずに返す）"""
+    run = crud_schedule.get_schedule_run(db, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="保存済みのシフトがありません")
+    return _schedule_run_detail(db, run, compact)
+
+
+@router.get("/staff/shifts", response_model=List[schemas.StaffShift])
+def read_my_shifts(year: int, month: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    """ログイン中のスタッフの、対象月の最新シフトでの勤務日一覧"""
+    rows = crud_schedule.get_staff_month_assignments(db, current_user.id, year, month)
+    return [{"date": d, "task_id": task_id, "task_name": task_name} for d, task_id, task_name in rows]
+
+
+@router.get("/generate-shift/{job_id}", response_model=schemas.ShiftJob)
+def get_generate_shift_job(job_id: str):
+    """シフト生成ジョブの状態を取得（完了していれば ExcelのダウンロードURL とシフトデータを含む）"""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    return job.to_dict()
+
+
+@router.post("/generate-shift/{job_id}/cancel", response_model=schemas.ShiftJob)
+def cancel_generate_shift_job(job_id: str):
+    """シフト生成ジョブをキャンセル（実行中の場合は求解を打ち切る）"""
+    job = job_manager.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    return job.to_dict()
 
 
 # Monthly Rest Day Setting (月間公休設定)
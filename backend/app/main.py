@@ -1,51 +1,36 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
-from sqlalchemy import text, inspect as sa_inspect
 
 from backend.core.config import settings
 from backend.core.logging import setup_logging, get_logger
-from backend.models.models import Base
 from backend.core.database import engine
+from backend.core.migrations import run_migrations
+from backend.crud.crud_shift import check_upsert_support
 from backend.api.endpoints import staffs, tasks, shifts, requests, auth
+from backend.solver.jobs import job_manager
 import os
 
 setup_logging()
 logger = get_logger(__name__)
 
-# データベースのテーブルを自動作成 (初回起動時)
-Base.metadata.create_all(bind=engine)
-
-# staffsテーブルに認証用カラムが存在しない場合は追加するマイグレーション
-with engine.connect() as conn:
-    inspector = sa_inspect(engine)
-    existing_columns = [col["name"] for col in inspector.get_columns("staffs")]
-    if "hashed_password" not in existing_columns:
-        conn.execute(text("ALTER TABLE staffs ADD COLUMN hashed_password VARCHAR"))
-        conn.commit()
-        logger.info("staffs.hashed_password カラムを追加しました")
-    if "is_admin" not in existing_columns:
-        conn.execute(text("ALTER TABLE staffs ADD COLUMN is_admin BOOLEAN DEFAULT FALSE"))
-        conn.commit()
-        logger.info("staffs.is_admin カラムを追加しました")
-
-# monthly_rest_day_settingsテーブルが存在しない場合はBase.metadata.create_allで自動作成済みだが、
-# 既存DBでテーブルが存在するか確認してなければ作成
-with engine.connect() as conn:
-    inspector = sa_inspect(engine)
-    if "monthly_rest_day_settings" not in inspector.get_table_names():
-        conn.execute(text(
-            "CREATE TABLE IF NOT EXISTS monthly_rest_day_settings "
-            "(id INTEGER PRIMARY KEY AUTOINCREMENT, "
-            "year INTEGER NOT NULL, "
-            "month INTEGER NOT NULL, "
-            "additional_days INTEGER NOT NULL DEFAULT 0)"
-        ))
-        conn.commit()
-        logger.info("monthly_rest_day_settings テーブルを作成しました")
-
-app = FastAPI()
+# 登録 API の upsert が使えない DB なら、リクエストを受ける前に止める
+check_upsert_support(engine)
+# テーブル作成と既存DBへのカラム・インデックス追加
+run_migrations(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # 終了時は実行中のシフト生成ジョブを打ち切る
+    job_manager.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 @app.exception_handler(Exception)
@@ -66,6 +51,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 大きな JSON（shift_data・カレンダー・統計）を gzip 圧縮する。
+# JSON 化は response_model 経由で Pydantic が直接バイト列にするため、レスポンスクラスは既定のままにする
+if settings.GZIP_MINIMUM_SIZE > 0:
+    app.add_middleware(
+        GZipMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE, compresslevel=settings.GZIP_COMPRESS_LEVEL,
+    )
+
 if not os.path.exists("static"):
     os.makedirs("static")
 
@@ -0,0 +1,115 @@
+"""レスポンスの JSON 化と gzip 圧縮のマイクロベンチマーク
+
+実行: python -m backend.benchmarks.serialization
+
+40名 × 31日の shift_data（通常形式・コンパクト形式）、管理者カレンダー、休暇統計の
+レスポンスを想定したデータで、以下を比較する。
+- jsonable_encoder + json.dumps（response_model なし・独自レスポンスクラス使用時の経路）
+- TypeAdapter.dump_json（response_model ありで FastAPI が使う Pydantic の経路）
+- orjson.dumps（インストールされていれば参考値）
+- gzip 圧縮後のサイズと圧縮時間
+"""
+import datetime
+import gzip
+import json
+import random
+import timeit
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from backend.core.config import settings
+from backend.models.models import Staff, Task
+from backend.schemas import schemas
+from backend.solver.exporter import REST, extract_compact_shift_data, extract_shift_data
+
+try:
+    import orjson
+except ImportError:  # 任意依存
+    orjson = None
+
+STAFF_COUNT = 40
+TASK_COUNT = 12
+YEAR, MONTH = 2025, 12
+DAYS = list(range(1, 32))
+
+
+def _shift_job(compact: bool) -> dict:
+    rng = random.Random(0)
+    staffs = [Staff(id=i, name=f"スタッフ{i:02d}", is_nurse=i < 6) for i in range(1, STAFF_COUNT + 1)]
+    tasks = [Task(id=i, name=f"業務{i:02d}") for i in range(1, TASK_COUNT + 1)]
+    matrix = [[rng.choice([REST] + list(range(TASK_COUNT))) for _ in DAYS] for _ in staffs]
+    extract = extract_compact_shift_data if compact else extract_shift_data
+    now = datetime.datetime.now()
+    return {
+        "job_id": "0" * 32, "status": "succeeded", "year": YEAR, "month": MONTH,
+        "created_at": now, "started_at": now, "finished_at": now,
+        "schedule_id": "0" * 64, "download_url": "/api/schedules/0/excel",
+        "shift_data": extract(matrix, staffs, tasks, DAYS, YEAR, MONTH),
+    }
+
+
+def _calendar() -> List[dict]:
+    rng = random.Random(1)
+    return [
+        {
+            "id": i, "staff_id": i % STAFF_COUNT + 1, "staff_name": f"スタッフ{i % STAFF_COUNT + 1:02d}",
+            "request_date": datetime.date(YEAR, MONTH, rng.choice(DAYS)),
+            "status": rng.choice(["pending", "approved"]),
+        }
+        for i in range(STAFF_COUNT * 8)
+    ]
+
+
+def _statistics() -> List[dict]:
+    return [
+        {
+            "date": datetime.date(YEAR, MONTH, d), "total_requests": 10, "approved_count": 6, "pending_count": 4,
+            "staff_names": [f"スタッフ{i:02d}" for i in range(1, 11)],
+        }
+        for d in DAYS
+    ]
+
+
+CASES = [
+    ("shift_data（通常）", schemas.ShiftJob, lambda: _shift_job(False)),
+    ("shift_data（コンパクト）", schemas.ShiftJob, lambda: _shift_job(True)),
+    ("管理者カレンダー", List[schemas.RequestedDayOffCalendarItem], _calendar),
+    ("休暇統計", List[schemas.RequestedDayOffStatistics], _statistics),
+]
+
+
+def _per_call_ms(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1000
+
+
+def main(number: int = 200):
+    level = settings.GZIP_COMPRESS_LEVEL
+    print(f"{'ケース':<22}{'サイズ':>10}{'gzip後':>10}{'encoder+dumps':>16}{'pydantic':>12}{'orjson':>10}{'gzip':>10}")
+    for name, model, build in CASES:
+        adapter = TypeAdapter(model)
+        value = adapter.validate_python(build())
+
+        def stdlib():
+            return json.dumps(jsonable_encoder(adapter.dump_python(value)), ensure_ascii=False).encode("utf-8")
+
+        def fast():
+            return adapter.dump_json(value)
+
+        body = fast()
+        compressed = gzip.compress(body, compresslevel=level)
+        orjson_ms = "-"
+        if orjson is not None:
+            plain = adapter.dump_python(value, mode="json")
+            orjson_ms = f"{_per_call_ms(lambda: orjson.dumps(plain), number):.3f}"
+        print(
+            f"{name:<22}{len(body):>10,}{len(compressed):>10,}"
+            f"{_per_call_ms(stdlib, number):>16.3f}{_per_call_ms(fast, number):>12.3f}{orjson_ms:>10}"
+            f"{_per_call_ms(lambda: gzip.compress(body, compresslevel=level), number):>10.3f}"
+        )
+    print("時間は1回あたりのミリ秒。orjson は dict 化済みデータのダンプのみの参考値")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,25 @@ class Settings(BaseSettings):
     ADMIN_USERNAME: str = "admin"
     ADMIN_PASSWORD: str = "admin123"
 
+    # CP-SAT ソルバー設定
+    SOLVER_TIME_LIMIT_SECONDS: float = 60.0   # 0 以下で無制限
+    SOLVER_NUM_WORKERS: int = 0               # 0 で CPU コア数すべてを使用
+    SOLVER_RELATIVE_GAP_LIMIT: float = 0.0    # 目的関数の相対ギャップがこの値以下で打ち切り
+    SOLVER_RANDOM_SEED: int = 0
+    SOLVER_SYMMETRY_BREAKING: bool = False    # 入れ替え可能なスタッフの対称性除去（ベンチマーク用）
+
+    # シフト生成ジョブ設定
+    SHIFT_JOB_MAX_WORKERS: int = 2      # 同時に実行する求解ジョブ数
+    SHIFT_JOB_MAX_RETAINED: int = 100   # メモリに保持するジョブ数（完了済みから破棄）
+
+    # 求解済みシフトのキャッシュ設定
+    SCHEDULE_CACHE_MAX_ENTRIES: int = 32        # 0 でキャッシュ無効
+    SCHEDULE_CACHE_TTL_SECONDS: float = 3600.0  # 0 以下で期限なし
+
+    # レスポンス圧縮（gzip）設定
+    GZIP_MINIMUM_SIZE: int = 1024   # このバイト数以上のレスポンスを圧縮（0 以下で無効）
+    GZIP_COMPRESS_LEVEL: int = 5
+
     model_config = {"env_file": ".env"}
 
 
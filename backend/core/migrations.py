@@ -0,0 +1,185 @@
+from sqlalchemy import Date, and_, func, select, text, inspect as sa_inspect
+from sqlalchemy.exc import IntegrityError
+
+from backend.core.logging import get_logger
+from backend.models.models import Base
+
+logger = get_logger(__name__)
+
+# 文字列から DATE 型に変更した列: テーブル名 -> (日付列, 重複を除くときのキー)
+DATE_COLUMNS = {
+    "absence_requests": ("date", ("staff_id", "date")),
+    "daily_requirements": ("date", ("date", "task_id")),
+    "holidays": ("date", ("date",)),
+}
+
+
+def run_migrations(engine):
+    """テーブルを作成し、既存 DB に後から追加したカラム・テーブル・インデックスを反映する"""
+    # データベースのテーブルを自動作成 (初回起動時)
+    Base.metadata.create_all(bind=engine)
+
+    _add_staff_auth_columns(engine)
+    _create_monthly_rest_day_settings(engine)
+    _add_schedule_run_draft_column(engine)
+    _convert_date_columns(engine)
+    _create_missing_indexes(engine)
+
+
+def _add_staff_auth_columns(engine):
+    """staffsテーブルに認証用カラムが存在しない場合は追加する"""
+    with engine.connect() as conn:
+        inspector = sa_inspect(engine)
+        existing_columns = [col["name"] for col in inspector.get_columns("staffs")]
+        if "hashed_password" not in existing_columns:
+            conn.execute(text("ALTER TABLE staffs ADD COLUMN hashed_password VARCHAR"))
+            conn.commit()
+            logger.info("staffs.hashed_password カラムを追加しました")
+        if "is_admin" not in existing_columns:
+            conn.execute(text("ALTER TABLE staffs ADD COLUMN is_admin BOOLEAN DEFAULT FALSE"))
+            conn.commit()
+            logger.info("staffs.is_admin カラムを追加しました")
+
+
+def _create_monthly_rest_day_settings(engine):
+    """monthly_rest_day_settingsテーブルは create_all で作成済みだが、既存DBでなければ作成する"""
+    with engine.connect() as conn:
+        inspector = sa_inspect(engine)
+        if "monthly_rest_day_settings" not in inspector.get_table_names():
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS monthly_rest_day_settings "
+                "(id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "year INTEGER NOT NULL, "
+                "month INTEGER NOT NULL, "
+                "additional_days INTEGER NOT NULL DEFAULT 0)"
+            ))
+            conn.commit()
+            logger.info("monthly_rest_day_settings テーブルを作成しました")
+
+
+def _add_schedule_run_draft_column(engine):
+    """schedule_runsテーブルに下書きフラグが存在しない場合は追加する"""
+    with engine.connect() as conn:
+        inspector = sa_inspect(engine)
+        existing_columns = [col["name"] for col in inspector.get_columns("schedule_runs")]
+        if "is_draft" not in existing_columns:
+            conn.execute(text("ALTER TABLE schedule_runs ADD COLUMN is_draft BOOLEAN NOT NULL DEFAULT FALSE"))
+            conn.commit()
+            logger.info("schedule_runs.is_draft カラムを追加しました")
+
+
+def _convert_date_columns(engine):
+    """YYYY-MM-DD 文字列で保存していた日付列を DATE 型に変換する"""
+    inspector = sa_inspect(engine)
+    table_names = set(inspector.get_table_names())
+    for table_name, (column, key) in DATE_COLUMNS.items():
+        if table_name not in table_names:
+            continue
+        column_type = next(c["type"] for c in inspector.get_columns(table_name) if c["name"] == column)
+        if isinstance(column_type, Date):
+            continue
+        if engine.dialect.name == "sqlite":
+            _rebuild_sqlite_table(engine, Base.metadata.tables[table_name], column, key)
+        elif engine.dialect.name == "postgresql":
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"ALTER TABLE {table_name} ALTER COLUMN {column} TYPE DATE USING NULLIF({column}, '')::date"
+                ))
+        else:
+            logger.warning("%s.%s を DATE 型に変換できません（未対応の DB: %s）", table_name, column, engine.dialect.name)
+            continue
+        logger.info("%s.%s を DATE 型に変換しました", table_name, column)
+
+
+def _rebuild_sqlite_table(engine, table, column, key):
+    """SQLite は列の型を変更できないため、モデル定義どおりにテーブルを作り直してデータを移す
+
+    日付として正しくない行は移さない。key が重複する行は ID が最大（最後に登録した）ものを残す。
+    移さなかった行は {テーブル名}_rejected テーブルに元の値のまま残す。
+    """
+    old_name = f"{table.name}__old"
+    rejected_name = f"{table.name}_rejected"
+    columns = ", ".join(c.name for c in table.columns)
+    with engine.begin() as conn:
+        # 新しいテーブルと名前が重ならないよう、旧テーブルのインデックスを先に削除する
+        for index in sa_inspect(conn).get_indexes(table.name):
+            conn.execute(text(f'DROP INDEX "{index["name"]}"'))
+        conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {old_name}"))
+        table.create(conn)
+        conn.execute(text(
+            f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {old_name} "
+            f"WHERE id IN (SELECT MAX(id) FROM {old_name} WHERE date({column}) = {column} "
+            f"GROUP BY {', '.join(key)})"
+        ))
+        not_moved = f"FROM {old_name} WHERE id NOT IN (SELECT id FROM {table.name})"
+        rejected_ids = [row[0] for row in conn.execute(text(f"SELECT id {not_moved} ORDER BY id"))]
+        if rejected_ids:
+            if sa_inspect(conn).has_table(rejected_name):
+                conn.execute(text(f"INSERT INTO {rejected_name} SELECT * {not_moved}"))
+            else:
+                conn.execute(text(f"CREATE TABLE {rejected_name} AS SELECT * {not_moved}"))
+        conn.execute(text(f"DROP TABLE {old_name}"))
+    if rejected_ids:
+        logger.warning(
+            "%s: 日付が不正または重複している %d 行を移行せず %s に残しました（id=%s）",
+            table.name, len(rejected_ids), rejected_name, rejected_ids,
+        )
+
+
+def _create_missing_indexes(engine):
+    """モデルに定義したインデックスのうち、既存テーブルにまだないものを作成する
+
+    create_all は既存テーブルにインデックスを追加しないため、後から追加したインデックスはここで作成する。
+    一意インデックスは upsert（ON CONFLICT）に必要なため、既存データのキーが重複していれば
+    行を削除せずに、重複している行の ID を示して起動を止める（管理者が整理してから再起動する）。
+    """
+    inspector = sa_inspect(engine)
+    table_names = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in table_names:
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            if index.unique:
+                duplicates = _find_duplicate_rows(engine, table, index)
+                if duplicates:
+                    raise RuntimeError(
+                        f"一意インデックス {index.name} を作成できません。{table.name} のキーが重複している行を"
+                        f"整理してから再起動してください: {_format_duplicates(duplicates)}"
+                    )
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except IntegrityError as exc:
+                raise RuntimeError(
+                    f"一意インデックス {index.name} を作成できません。{table.name} の重複データを確認してください"
+                ) from exc
+            logger.info("インデックス %s を作成しました", index.name)
+
+
+def _find_duplicate_rows(engine, table, index):
+    """一意インデックスのキーが重複している行を、キー -> ID のリストで返す
+
+    キーに NULL を含む行は一意インデックスに反しないため数えない。
+    """
+    key = [table.c[c.name] for c in index.columns]
+    duplicated = select(*key).where(*(c.is_not(None) for c in key)).group_by(*key).having(
+        func.count() > 1
+    ).subquery()
+    query = select(table.c.id, *key).join(
+        duplicated, and_(*(c == duplicated.c[c.name] for c in key))
+    ).order_by(*key, table.c.id)
+    duplicates = {}
+    with engine.connect() as conn:
+        for row in conn.execute(query):
+            duplicates.setdefault(tuple(row[1:]), []).append(row[0])
+    return duplicates
+
+
+def _format_duplicates(duplicates, limit=20):
+    """重複しているキーと ID をエラーメッセージ用に並べる（多い場合は先頭 limit 件）"""
+    items = [f"{key} の id={ids}" for key, ids in list(duplicates.items())[:limit]]
+    if len(duplicates) > limit:
+        items.append(f"ほか{len(duplicates) - limit}件")
+    return ", ".join(items)
@@ -1,6 +1,7 @@
 from datetime import date, datetime
 from typing import Optional, List
-from sqlalchemy.orm import Session
+from sqlalchemy import case, func, insert, update
+from sqlalchemy.orm import Session, joinedload
 from backend.models.models import RequestedDayOff, Staff
 
 
@@ -32,12 +33,80 @@ def create_request(db: Session, staff_id: int, request_date: date, reason: Optio
     return db_req
 
 
+def get_existing_request_dates(db: Session, staff_id: int, request_dates: List[date]) -> set:
+    """指定日のうち、すでに申請がある日付の集合を1クエリで返す"""
+    if not request_dates:
+        return set()
+    rows = db.query(RequestedDayOff.request_date).filter(
+        RequestedDayOff.staff_id == staff_id,
+        RequestedDayOff.request_date.in_(request_dates),
+    ).all()
+    return {row.request_date for row in rows}
+
+
+def create_requests(db: Session, staff_id: int, request_dates: List[date], reason: Optional[str] = None):
+    """複数日の申請を1回の INSERT ... RETURNING で登録し、日付順に返す（コミットは呼び出し側）"""
+    db_reqs = db.scalars(
+        insert(RequestedDayOff).returning(RequestedDayOff),
+        [{"staff_id": staff_id, "request_date": d, "reason": reason} for d in request_dates],
+    ).all()
+    return sorted(db_reqs, key=lambda r: r.request_date)
+
+
 def commit_and_refresh(db: Session, db_req: RequestedDayOff):
     db.commit()
     db.refresh(db_req)
     return db_req
 
 
+# 一括ステータス変更で、変更先ごとに許可する変更前の状態
+STATUS_TRANSITIONS = {
+    "approved": ("pending",),
+    "rejected": ("pending",),
+    "pending": ("approved", "rejected"),
+}
+
+
+def bulk_update_status(
+    db: Session,
+    request_ids: List[int],
+    status: str,
+    acted_by: Optional[str] = None,
+    rejection_reason: Optional[str] = None,
+) -> List[int]:
+    """STATUS_TRANSITIONS で許可された申請だけを1回の UPDATE で変更し、変更したIDを返す（コミットは呼び出し側）"""
+    now = datetime.utcnow()
+    values = {"status": status, "updated_at": now}
+    if status == "approved":
+        values.update(approved_at=now, approved_by=acted_by, rejection_reason=None)
+    elif status == "rejected":
+        values.update(approved_by=acted_by, rejection_reason=rejection_reason)
+    else:
+        values.update(approved_at=None, approved_by=None, rejection_reason=None)
+
+    condition = (
+        RequestedDayOff.id.in_(request_ids),
+        RequestedDayOff.status.in_(STATUS_TRANSITIONS[status]),
+    )
+    stmt = update(RequestedDayOff).where(*condition).values(**values).execution_options(synchronize_session=False)
+    if db.get_bind().dialect.update_returning:
+        return list(db.scalars(stmt.returning(RequestedDayOff.id)))
+
+    # UPDATE ... RETURNING 非対応の DB では対象IDを先に取得する
+    ids = [row.id for row in db.query(RequestedDayOff.id).filter(*condition).with_for_update()]
+    if ids:
+        db.execute(stmt)
+    return ids
+
+
+def get_request_statuses(db: Session, request_ids: List[int]) -> dict:
+    """申請ID -> 現在の status を1クエリで返す（存在しないIDは含まない）"""
+    if not request_ids:
+        return {}
+    rows = db.query(RequestedDayOff.id, RequestedDayOff.status).filter(RequestedDayOff.id.in_(request_ids)).all()
+    return {row.id: row.status for row in rows}
+
+
 def delete_request(db: Session, db_req: RequestedDayOff):
     db.delete(db_req)
     db.commit()
@@ -76,7 +145,8 @@ def get_calendar_requests(db: Session, year: int, month: int, status_filter: Opt
     else:
         end_date = date(year, month + 1, 1)
 
-    query = db.query(RequestedDayOff).filter(
+    # staff_name 表示用にスタッフを同じクエリで読み込む（行ごとの追加クエリを避ける）
+    query = db.query(RequestedDayOff).options(joinedload(RequestedDayOff.staff)).filter(
         RequestedDayOff.request_date >= start_date,
         RequestedDayOff.request_date < end_date,
     )
@@ -96,7 +166,7 @@ def get_all_requests_admin(
     year: Optional[int] = None,
     month: Optional[int] = None,
 ):
-    query = db.query(RequestedDayOff)
+    query = db.query(RequestedDayOff).options(joinedload(RequestedDayOff.staff))
 
     if status:
         query = query.filter(RequestedDayOff.status == status)
@@ -116,15 +186,31 @@ def get_all_requests_admin(
     return query.order_by(RequestedDayOff.created_at.desc()).all()
 
 
-def get_statistics_requests(db: Session, year: int, month: int):
+# 統計クエリで職員名を連結する区切り文字（職員名に含まれない制御文字）
+STAFF_NAME_SEPARATOR = "\x1f"
+
+
+def get_day_off_statistics(db: Session, year: int, month: int):
+    """対象月の申請中・承認済みの休み希望を日付ごとに集計する
+
+    1行 = (request_date, total, approved, pending, staff_names) を日付順に返す。
+    staff_names は STAFF_NAME_SEPARATOR 区切りの文字列（連結順は不定）。
+    """
     start_date = date(year, month, 1)
     if month == 12:
         end_date = date(year + 1, 1, 1)
     else:
         end_date = date(year, month + 1, 1)
 
-    return db.query(RequestedDayOff).filter(
+    staff_name = func.coalesce(Staff.name, "Unknown")
+    return db.query(
+        RequestedDayOff.request_date,
+        func.count(RequestedDayOff.id).label("total"),
+        func.sum(case((RequestedDayOff.status == "approved", 1), else_=0)).label("approved"),
+        func.sum(case((RequestedDayOff.status == "pending", 1), else_=0)).label("pending"),
+        func.aggregate_strings(staff_name, STAFF_NAME_SEPARATOR).label("staff_names"),
+    ).outerjoin(Staff, Staff.id == RequestedDayOff.staff_id).filter(
         RequestedDayOff.request_date >= start_date,
         RequestedDayOff.request_date < end_date,
         RequestedDayOff.status.in_(["pending", "approved"]),
-    ).all()
+    ).group_by(RequestedDayOff.request_date).order_by(RequestedDayOff.request_date).all()
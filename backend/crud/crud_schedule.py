@@ -0,0 +1,112 @@
+import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.models.models import ScheduleRun, ScheduleAssignment, Task
+
+# (staff_id, day) -> task_id。休みの日はキーを持たない（solver.hints.Assignments と同じ形）
+Assignments = Dict[Tuple[int, int], int]
+
+
+# 同じ月への同時保存で version が衝突したときに採番し直す回数
+VERSION_RETRIES = 5
+
+
+def _next_version(db: Session, year: int, month: int) -> int:
+    latest_version = db.query(func.max(ScheduleRun.version)).filter(
+        ScheduleRun.year == year,
+        ScheduleRun.month == month,
+    ).scalar()
+    return (latest_version or 0) + 1
+
+
+def create_schedule_run(db: Session, year: int, month: int, assignments: Assignments, source: str = "generate",
+                        input_hash: Optional[str] = None, is_draft: bool = False):
+    """確定シフトを対象月の新しい version として保存する（割り当ては一括 INSERT）
+
+    別の保存と version が重なった場合（一意制約違反）は、採番し直して再試行する。
+    is_draft=True の下書きは履歴には残るが、最新シフトとしては扱わない。
+    """
+    for attempt in range(VERSION_RETRIES):
+        run = ScheduleRun(
+            year=year, month=month, version=_next_version(db, year, month), source=source, input_hash=input_hash,
+            is_draft=is_draft,
+        )
+        try:
+            with db.begin_nested():
+                db.add(run)
+        except IntegrityError:
+            if attempt == VERSION_RETRIES - 1:
+                raise
+            continue
+        break
+
+    rows = [
+        {"run_id": run.id, "staff_id": s_id, "date": datetime.date(year, month, d), "task_id": t_id}
+        for (s_id, d), t_id in sorted(assignments.items())
+    ]
+    if rows:
+        db.execute(insert(ScheduleAssignment), rows)
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+def get_schedule_run(db: Session, run_id: int):
+    return db.query(ScheduleRun).filter(ScheduleRun.id == run_id).first()
+
+
+def get_schedule_runs(db: Session, year: int, month: int):
+    """対象月の保存済みシフトを新しい順に返す"""
+    return db.query(ScheduleRun).filter(
+        ScheduleRun.year == year,
+        ScheduleRun.month == month,
+    ).order_by(ScheduleRun.version.desc()).all()
+
+
+def get_latest_schedule_run(db: Session, year: int, month: int):
+    """対象月の最新の確定シフト（下書きは除く）"""
+    return db.query(ScheduleRun).filter(
+        ScheduleRun.year == year,
+        ScheduleRun.month == month,
+        ScheduleRun.is_draft.is_(False),
+    ).order_by(ScheduleRun.version.desc()).first()
+
+
+def get_schedule_run_by_input_hash(db: Session, input_hash: str):
+    """同じ入力から生成した直近のシフト"""
+    return db.query(ScheduleRun).filter(
+        ScheduleRun.input_hash == input_hash,
+    ).order_by(ScheduleRun.id.desc()).first()
+
+
+def get_run_assignments(db: Session, run_id: int) -> Assignments:
+    """保存済みシフトの割り当てを (staff_id, day) -> task_id で返す"""
+    rows = db.query(
+        ScheduleAssignment.staff_id, ScheduleAssignment.date, ScheduleAssignment.task_id,
+    ).filter(ScheduleAssignment.run_id == run_id).all()
+    return {(staff_id, d.day): task_id for staff_id, d, task_id in rows}
+
+
+def get_latest_assignments(db: Session, year: int, month: int) -> Optional[Assignments]:
+    """対象月の最新の確定シフトの割り当て。保存されていなければ None"""
+    run = get_latest_schedule_run(db, year, month)
+    return get_run_assignments(db, run.id) if run else None
+
+
+def get_staff_month_assignments(db: Session, staff_id: int, year: int, month: int):
+    """対象月の最新シフト（下書きは除く）のうち、指定スタッフの勤務日を日付順に (date, task_id, task_name) で返す"""
+    latest_run_id = select(ScheduleRun.id).where(
+        ScheduleRun.year == year,
+        ScheduleRun.month == month,
+        ScheduleRun.is_draft.is_(False),
+    ).order_by(ScheduleRun.version.desc()).limit(1).scalar_subquery()
+    return db.query(
+        ScheduleAssignment.date, Task.id, Task.name,
+    ).join(Task, Task.id == ScheduleAssignment.task_id).filter(
+        ScheduleAssignment.run_id == latest_run_id,
+        ScheduleAssignment.staff_id == staff_id,
+    ).order_by(ScheduleAssignment.date).all()
@@ -1,30 +1,82 @@
+import calendar
+import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 from backend.models.models import (
     Staff, Task, AbsenceRequest, DailyRequirement, RequestedDayOff, Holiday,
-    MonthlyRestDaySetting,
+    MonthlyRestDaySetting, RequirementTemplate,
 )
 from backend.schemas.schemas import AbsenceRequestCreate, DailyRequirementCreate, HolidayCreate
 
 
+def _to_date(value):
+    """API の YYYY-MM-DD 文字列を DB の date に変換する"""
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(value)
+
+
+def _month_range(year: int, month: int):
+    """対象月の [初日, 翌月初日) を返す"""
+    start = datetime.date(year, month, 1)
+    end = datetime.date(year + 1, 1, 1) if month == 12 else datetime.date(year, month + 1, 1)
+    return start, end
+
+
+# INSERT ... ON CONFLICT を組み立てられる DB（方言名 -> insert 関数）
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def check_upsert_support(engine):
+    """登録 API の upsert に対応していない DB なら、リクエストを受ける前（起動時）に止める"""
+    if engine.dialect.name not in UPSERT_INSERTS:
+        raise RuntimeError(
+            f"{engine.dialect.name} は未対応の DB です（対応: {', '.join(sorted(UPSERT_INSERTS))}）"
+        )
+
+
+def _upsert_statement(db: Session, model, values, index_elements, update_columns):
+    """一意キー（index_elements）の衝突時に update_columns を更新する INSERT ... ON CONFLICT 文を作る
+
+    values は dict またはそのリスト（複数行は1文の VALUES にまとめる）。SQLite と PostgreSQL に対応。
+    update_columns が空なら衝突した行は何もしない（ON CONFLICT DO NOTHING）。
+    """
+    # 未対応の DB は起動時に check_upsert_support で止めている
+    stmt = UPSERT_INSERTS[db.get_bind().dialect.name](model).values(values)
+    if not update_columns:
+        return stmt.on_conflict_do_nothing(index_elements=index_elements)
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: stmt.excluded[column] for column in update_columns},
+    )
+
+
+def _upsert_one(db: Session, model, values, index_elements, update_columns):
+    """1行を upsert し、登録・更新後の行を1往復で返す（INSERT ... ON CONFLICT ... RETURNING）
+
+    既存行を返したいだけのときは update_columns にキー列を渡す（同じ値で更新するだけなので内容は変わらない）。
+    コミット後に再読み込みしないよう、返す行はセッションから切り離しておく。
+    """
+    stmt = _upsert_statement(db, model, values, index_elements, update_columns).returning(model)
+    row = db.scalars(stmt, execution_options={"populate_existing": True}).one()
+    db.expunge(row)
+    db.commit()
+    return row
+
+
 # --- AbsenceRequest ---
 
 def get_absences(db: Session):
     return db.query(AbsenceRequest).all()
 
 
-def get_absence_duplicate(db: Session, staff_id: int, date: str):
-    return db.query(AbsenceRequest).filter(
-        AbsenceRequest.staff_id == staff_id,
-        AbsenceRequest.date == date,
-    ).first()
-
-
 def create_absence(db: Session, req: AbsenceRequestCreate):
-    db_req = AbsenceRequest(staff_id=req.staff_id, date=req.date)
-    db.add(db_req)
-    db.commit()
-    db.refresh(db_req)
-    return db_req
+    """希望休を登録する。同じスタッフ・日付がすでにあればその行を返す"""
+    values = {"staff_id": req.staff_id, "date": _to_date(req.date)}
+    return _upsert_one(db, AbsenceRequest, values, ["staff_id", "date"], ["staff_id"])
 
 
 def get_absence_by_id(db: Session, absence_id: int):
@@ -42,48 +94,111 @@ def get_requirements(db: Session):
     return db.query(DailyRequirement).all()
 
 
-def get_requirement_by_date_task(db: Session, date: str, task_id: int):
-    return db.query(DailyRequirement).filter(
-        DailyRequirement.date == date,
-        DailyRequirement.task_id == task_id,
-    ).first()
+def upsert_requirement(db: Session, req: DailyRequirementCreate):
+    """日次要件を登録する。同じ日付・業務がすでにあれば人数を更新する"""
+    values = {"date": _to_date(req.date), "task_id": req.task_id, "count": req.count}
+    return _upsert_one(db, DailyRequirement, values, ["date", "task_id"], ["count"])
 
 
-def create_requirement(db: Session, req: DailyRequirementCreate):
-    db_req = DailyRequirement(date=req.date, task_id=req.task_id, count=req.count)
-    db.add(db_req)
+def upsert_requirements(db: Session, year: int, month: int, counts):
+    """対象月の (day, task_id) -> count を1回の upsert で登録・更新し、件数を返す"""
+    values = [
+        {"date": datetime.date(year, month, d), "task_id": t_id, "count": count}
+        for (d, t_id), count in sorted(counts.items())
+    ]
+    if not values:
+        return 0
+    db.execute(_upsert_statement(db, DailyRequirement, values, ["date", "task_id"], ["count"]))
+    db.commit()
+    return len(values)
+
+
+# --- RequirementTemplate (日次要件の定型) ---
+
+def expand_weekday_pattern(pattern: Dict[int, List[Optional[int]]], year, month) -> Dict[Tuple[int, int], int]:
+    """task_id -> 月曜〜日曜の必要人数 の定型を、対象月の (day, task_id) -> count に展開する
+
+    人数が None の曜日は展開しない（その曜日は要件なし）。
+    """
+    _, last_day = calendar.monthrange(year, month)
+    expanded = {}
+    for d in range(1, last_day + 1):
+        weekday = datetime.date(year, month, d).weekday()
+        for t_id, counts in pattern.items():
+            if counts[weekday] is not None:
+                expanded[(d, t_id)] = counts[weekday]
+    return expanded
+
+
+def get_requirement_templates(db: Session):
+    return db.query(RequirementTemplate).order_by(RequirementTemplate.task_id, RequirementTemplate.weekday).all()
+
+
+def set_requirement_templates(db: Session, pattern):
+    """task_id -> 月曜〜日曜の人数 で定型を登録・更新し、None の曜日は削除する（1トランザクション）"""
+    values = [
+        {"weekday": weekday, "task_id": t_id, "count": count}
+        for t_id, counts in pattern.items()
+        for weekday, count in enumerate(counts) if count is not None
+    ]
+    cleared = [(weekday, t_id) for t_id, counts in pattern.items() for weekday, count in enumerate(counts) if count is None]
+    if values:
+        db.execute(_upsert_statement(db, RequirementTemplate, values, ["weekday", "task_id"], ["count"]))
+    if cleared:
+        db.query(RequirementTemplate).filter(
+            tuple_(RequirementTemplate.weekday, RequirementTemplate.task_id).in_(cleared)
+        ).delete(synchronize_session=False)
     db.commit()
-    db.refresh(db_req)
-    return db_req
 
 
-def update_requirement(db: Session, existing: DailyRequirement, count: int):
-    existing.count = count
+def delete_requirement_templates(db: Session, task_id: int) -> int:
+    """業務の定型をすべて削除し、削除件数を返す"""
+    deleted = db.query(RequirementTemplate).filter(RequirementTemplate.task_id == task_id).delete()
     db.commit()
-    db.refresh(existing)
-    return existing
+    return deleted
+
+
+def _month_requirements(db: Session, year: int, month: int, start, end):
+    """定型を対象月に展開し、同じ日・業務の DailyRequirement で上書きした要件を返す（DB には保存しない）"""
+    pattern = {}
+    for t in db.query(RequirementTemplate).all():
+        pattern.setdefault(t.task_id, [None] * 7)[t.weekday] = t.count
+    counts = {
+        (datetime.date(year, month, d), t_id): count
+        for (d, t_id), count in expand_weekday_pattern(pattern, year, month).items()
+    }
+    overrides = db.query(DailyRequirement).filter(
+        DailyRequirement.date >= start,
+        DailyRequirement.date < end,
+    ).all()
+    for r in overrides:
+        counts[(r.date, r.task_id)] = r.count
+    return [DailyRequirement(date=d, task_id=t_id, count=count) for (d, t_id), count in sorted(counts.items())]
+
+
+def get_effective_requirements(db: Session, year: int, month: int):
+    """シフト生成で実際に使う対象月の要件（定型を展開し、日次要件で上書きしたもの）"""
+    start, end = _month_range(year, month)
+    return _month_requirements(db, year, month, start, end)
 
 
 # --- Holiday (施設休日) ---
 
 def get_holidays(db: Session, year: int, month: int):
     """指定年月の休日一覧を取得"""
-    prefix = f"{year}-{str(month).zfill(2)}-"
-    return db.query(Holiday).filter(Holiday.date.startswith(prefix)).all()
+    start, end = _month_range(year, month)
+    return db.query(Holiday).filter(Holiday.date >= start, Holiday.date < end).all()
 
 
 def create_holiday(db: Session, holiday: HolidayCreate):
-    """休日を登録"""
-    db_holiday = Holiday(date=holiday.date, description=holiday.description)
-    db.add(db_holiday)
-    db.commit()
-    db.refresh(db_holiday)
-    return db_holiday
+    """休日を登録。同じ日付がすでにあればその行を返す"""
+    values = {"date": _to_date(holiday.date), "description": holiday.description}
+    return _upsert_one(db, Holiday, values, ["date"], ["date"])
 
 
 def get_holiday_by_date(db: Session, date: str):
     """指定日の休日レコードを取得"""
-    return db.query(Holiday).filter(Holiday.date == date).first()
+    return db.query(Holiday).filter(Holiday.date == _to_date(date)).first()
 
 
 def delete_holiday(db: Session, date: str):
@@ -110,34 +225,33 @@ def get_monthly_rest_setting(db: Session, year: int, month: int):
 
 
 def upsert_monthly_rest_setting(db: Session, year: int, month: int, additional_days: int):
-    existing = get_monthly_rest_setting(db, year, month)
-    if existing:
-        existing.additional_days = additional_days
-        db.commit()
-        db.refresh(existing)
-        return existing
-    else:
-        setting = MonthlyRestDaySetting(year=year, month=month, additional_days=additional_days)
-        db.add(setting)
-        db.commit()
-        db.refresh(setting)
-        return setting
+    values = {"year": year, "month": month, "additional_days": additional_days}
+    return _upsert_one(db, MonthlyRestDaySetting, values, ["year", "month"], ["additional_days"])
 
 
 # --- Shift generation data ---
 
-def get_all_shift_data(db: Session):
-    """Fetch all data needed for shift generation."""
+def get_month_shift_data(db: Session, year: int, month: int):
+    """Fetch the data needed to generate the shift for one month.
+
+    日次要件・施設休日・承認済みの休み希望は対象月の範囲条件（インデックスを使う）で絞り込んで取得する。
+    日次要件は曜日ごとの定型（RequirementTemplate）を対象月に展開し、日付指定の DailyRequirement で上書きする。
+    """
+    start, end = _month_range(year, month)
     staffs = db.query(Staff).all()
     tasks = db.query(Task).all()
-    approved_requests = db.query(RequestedDayOff).filter(RequestedDayOff.status == "approved").all()
+    approved_requests = db.query(RequestedDayOff.staff_id, RequestedDayOff.request_date).filter(
+        RequestedDayOff.request_date >= start,
+        RequestedDayOff.request_date < end,
+        RequestedDayOff.status == "approved",
+    ).all()
 
     class MockAbsence:
-        def __init__(self, staff_id, date_str):
+        def __init__(self, staff_id, date):
             self.staff_id = staff_id
-            self.date = date_str
+            self.date = date
 
-    absences = [MockAbsence(r.staff_id, r.request_date.strftime("%Y-%m-%d")) for r in approved_requests]
-    requirements = db.query(DailyRequirement).all()
-    holidays = db.query(Holiday).all()
+    absences = [MockAbsence(r.staff_id, r.request_date) for r in approved_requests]
+    requirements = _month_requirements(db, year, month, start, end)
+    holidays = db.query(Holiday).filter(Holiday.date >= start, Holiday.date < end).all()
     return staffs, tasks, absences, requirements, holidays
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Date
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Date, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from backend.core.database import Base
 from datetime import datetime
@@ -45,22 +45,46 @@ class AbsenceRequest(Base):
     __tablename__ = "absence_requests"
     id = Column(Integer, primary_key=True, index=True)
     staff_id = Column(Integer, ForeignKey("staffs.id"))
-    date = Column(String, index=True)
+    date = Column(Date, index=True)
+
+    __table_args__ = (
+        # 1スタッフ1日1件（create_absence の upsert で使う）
+        Index("uq_absence_requests_staff_date", "staff_id", "date", unique=True),
+    )
 
 # --- 日次要件 (DailyRequirement) ---
 class DailyRequirement(Base):
     __tablename__ = "daily_requirements"
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(String, index=True)
+    date = Column(Date)
     task_id = Column(Integer, ForeignKey("tasks.id"))
     count = Column(Integer, default=1)
 
+    __table_args__ = (
+        # 1日1業務1件。日付の範囲検索もこのインデックスで行う
+        Index("uq_daily_requirements_date_task", "date", "task_id", unique=True),
+    )
+
+
+# --- 日次要件の定型 (RequirementTemplate) ---
+class RequirementTemplate(Base):
+    """曜日 × 業務ごとの必要人数。シフト生成時に対象月へ展開し、同じ日・業務の DailyRequirement で上書きする"""
+    __tablename__ = "requirement_templates"
+    id = Column(Integer, primary_key=True, index=True)
+    weekday = Column(Integer, nullable=False)  # 0=月曜 〜 6=日曜
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    count = Column(Integer, nullable=False, default=1)
+
+    __table_args__ = (
+        Index("uq_requirement_templates_weekday_task", "weekday", "task_id", unique=True),
+    )
+
 
 # --- 施設休日 (Holiday) ---
 class Holiday(Base):
     __tablename__ = "holidays"
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(String, unique=True, index=True)  # YYYY-MM-DD形式
+    date = Column(Date, unique=True, index=True)
     description = Column(String, nullable=True)
 
 # --- 月間公休設定 (MonthlyRestDaySetting) ---
@@ -71,6 +95,10 @@ class MonthlyRestDaySetting(Base):
     month = Column(Integer, nullable=False, index=True)
     additional_days = Column(Integer, nullable=False, default=0)  # 管理者設定の公休数
 
+    __table_args__ = (
+        Index("uq_monthly_rest_day_settings_year_month", "year", "month", unique=True),
+    )
+
 
 # --- 休暇申請 (RequestedDayOff) ---
 class RequestedDayOff(Base):
@@ -89,3 +117,55 @@ class RequestedDayOff(Base):
 
     # Relationships
     staff = relationship("Staff", backref="requested_days_off")
+
+    __table_args__ = (
+        # 日付別統計（日付範囲 + status で集計）用
+        Index("ix_requested_days_off_date_status", "request_date", "status"),
+        # 1スタッフ1日1件。既存DBにも後から作成できるよう一意インデックスで定義する
+        Index("uq_requested_days_off_staff_date", "staff_id", "request_date", unique=True),
+    )
+
+
+# --- シフト生成結果 (ScheduleRun) ---
+class ScheduleRun(Base):
+    """1回分の確定シフト。同じ月の結果は version を増やして履歴として残す"""
+    __tablename__ = "schedule_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False)  # 同じ年月の中での通し番号（1始まり）
+    source = Column(String(20), nullable=False, default="generate")  # generate/repair/upload
+    input_hash = Column(String(64), nullable=True, index=True)  # 生成時のソルバー入力ハッシュ
+    # 弾性モードで要件を満たせなかった下書き。最新シフト・スタッフ向け表示・修復・ヒントには使わない
+    is_draft = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    assignments = relationship("ScheduleAssignment", back_populates="run", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        UniqueConstraint("year", "month", "version", name="uq_schedule_runs_year_month_version"),
+    )
+
+
+# --- シフト割り当て (ScheduleAssignment) ---
+class ScheduleAssignment(Base):
+    """確定シフトの1セル（スタッフ・日付・業務）。休みの日は行を持たない"""
+    __tablename__ = "schedule_assignments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey("schedule_runs.id", ondelete="CASCADE"), nullable=False)
+    staff_id = Column(Integer, ForeignKey("staffs.id"), nullable=False)
+    date = Column(Date, nullable=False)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+
+    run = relationship("ScheduleRun", back_populates="assignments")
+
+    __table_args__ = (
+        # 「このスタッフの今月のシフト」用（run_id, staff_id で絞って日付順）
+        UniqueConstraint("run_id", "staff_id", "date", name="uq_schedule_assignments_run_staff_date"),
+        # 日付ごとの表示用
+        Index("ix_schedule_assignments_run_date", "run_id", "date"),
+        # スタッフ単位で月をまたいで引く用
+        Index("ix_schedule_assignments_staff_date", "staff_id", "date"),
+    )
@@ -9,3 +9,19 @@ class TaskCategory(str, Enum):
 
 # 1日に必要な最低ドライバー数
 DRIVER_MIN_COUNT = 6
+
+
+class JobStatus(str, Enum):
+    """シフト生成ジョブの状態"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class DayOffStatus(str, Enum):
+    """休み希望申請の状態"""
+    PENDING = "pending"
+    APPROVED = "approved"
+    REJECTED = "rejected"
@@ -1,6 +1,19 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List
+import calendar
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Dict, Optional, List
 from datetime import date, datetime
+from backend.schemas.enums import DayOffStatus, JobStatus
+
+def _iso_date(value):
+    """日付を API 上の YYYY-MM-DD 文字列にそろえる（DB の date はそのまま変換、文字列は形式を検証）"""
+    if isinstance(value, date):
+        return value.isoformat()
+    if not isinstance(value, str):
+        # TypeError は 500 になるため、ValueError にして 422 で返す
+        raise ValueError("日付は YYYY-MM-DD 形式の文字列で指定してください")
+    return date.fromisoformat(value).isoformat()
+
 
 # --- Staff用スキーマ ---
 class StaffBase(BaseModel):
@@ -49,6 +62,8 @@ class AbsenceRequestBase(BaseModel):
     staff_id: int
     date: str  # YYYY-MM-DD形式
 
+    _check_date = field_validator("date", mode="before")(_iso_date)
+
 class AbsenceRequestCreate(AbsenceRequestBase):
     pass
 
@@ -61,10 +76,12 @@ class AbsenceRequest(AbsenceRequestBase):
 
 # --- 日次要件 (DailyRequirement) ---
 class DailyRequirementBase(BaseModel):
-    date: str
+    date: str  # YYYY-MM-DD形式
     task_id: int
     count: int = 1
 
+    _check_date = field_validator("date", mode="before")(_iso_date)
+
 class DailyRequirementCreate(DailyRequirementBase):
     pass
 
@@ -73,9 +90,159 @@ class DailyRequirement(DailyRequirementBase):
     class Config:
         from_attributes = True
 
+class EffectiveRequirement(DailyRequirementBase):
+    """定型と日次要件を合わせた、対象月で実際に使われる要件（保存されていない行も含むため id はない）"""
+    class Config:
+        from_attributes = True
+
+class DailyRequirementMonthUpsert(BaseModel):
+    """1か月分の日次要件をまとめて登録・更新する。matrix と weekday_pattern のどちらか一方を指定"""
+    year: int
+    month: int = Field(..., ge=1, le=12)
+    # task_id -> 1日から月末までの必要人数
+    matrix: Optional[Dict[int, List[int]]] = None
+    # task_id -> 月曜から日曜までの必要人数（曜日ごとの定型を月全体に展開する）
+    weekday_pattern: Optional[Dict[int, List[int]]] = None
+
+    @model_validator(mode="after")
+    def _check_counts(self):
+        if (self.matrix is None) == (self.weekday_pattern is None):
+            raise ValueError("matrix と weekday_pattern のどちらか一方を指定してください")
+        if self.matrix is not None:
+            rows, length = self.matrix, calendar.monthrange(self.year, self.month)[1]
+        else:
+            rows, length = self.weekday_pattern, 7
+        for t_id, counts in rows.items():
+            if len(counts) != length:
+                raise ValueError(f"task_id {t_id}: 必要人数は {length} 件指定してください")
+            if any(c < 0 for c in counts):
+                raise ValueError(f"task_id {t_id}: 必要人数は 0 以上で指定してください")
+        return self
+
+class DailyRequirementMonthResult(BaseModel):
+    """1か月分の日次要件の一括登録結果"""
+    year: int
+    month: int
+    upserted: int
+
+class RequirementTemplate(BaseModel):
+    """曜日 × 業務の必要人数の定型（weekday: 0=月曜 〜 6=日曜）"""
+    id: int
+    weekday: int
+    task_id: int
+    count: int
+    class Config:
+        from_attributes = True
+
+class RequirementTemplateUpsert(BaseModel):
+    """業務ごとに月曜〜日曜の必要人数の定型を設定する。None の曜日は定型を削除する"""
+    weekday_pattern: Dict[int, List[Optional[int]]]
+
+    @field_validator("weekday_pattern")
+    @classmethod
+    def _check_pattern(cls, pattern):
+        for t_id, counts in pattern.items():
+            if len(counts) != 7:
+                raise ValueError(f"task_id {t_id}: 月曜〜日曜の 7 件を指定してください")
+            if any(c is not None and c < 0 for c in counts):
+                raise ValueError(f"task_id {t_id}: 必要人数は 0 以上で指定してください")
+        return pattern
+
 class GenerateRequest(BaseModel):
     year: int
     month: int
+    # ソルバー設定（未指定なら Settings の既定値）
+    time_limit_seconds: Optional[float] = Field(None, gt=0, description="求解の制限時間（秒）")
+    num_workers: Optional[int] = Field(None, ge=1, description="並列探索ワーカー数")
+    relative_gap_limit: Optional[float] = Field(None, ge=0, le=1, description="相対ギャップで打ち切る閾値")
+    random_seed: Optional[int] = Field(None, ge=0, description="乱数シード")
+    warm_start: bool = Field(True, description="前回（なければ前月）のシフトをヒントに求解する")
+    elastic: bool = Field(False, description="必要人数・月間休日数の不足を許して必ず下書きを返す")
+    symmetry_breaking: Optional[bool] = Field(None, description="入れ替え可能なスタッフの対称性除去（未指定なら Settings）")
+    compact: bool = Field(False, description="shift_data をスタッフ・業務一覧 + 業務インデックス行列の形式で返す")
+
+
+class ShiftRepairRestItem(BaseModel):
+    """局所修復で休みにするスタッフと日付"""
+    staff_id: int
+    date: date
+
+
+class ShiftRepairRequest(BaseModel):
+    """既存シフトの局所修復リクエスト"""
+    year: int
+    month: int
+    rest_requests: List[ShiftRepairRestItem] = Field(default_factory=list, description="休みにする (スタッフ, 日付)")
+    changed_dates: List[date] = Field(default_factory=list, description="要件などが変わった日付")
+    dry_run: bool = Field(False, description="True なら現在のシフトを更新せず、修復可否だけを確認する")
+
+
+class ShiftRepairCell(BaseModel):
+    """修復で割り当てが変わったセル（task_id が None は休み）"""
+    staff_id: int
+    date: str
+    before_task_id: Optional[int] = None
+    after_task_id: Optional[int] = None
+
+
+class ShiftRepairResult(BaseModel):
+    """局所修復の結果"""
+    run_id: Optional[int] = None
+    schedule_id: Optional[str] = None
+    download_url: Optional[str] = None
+    shift_data: dict
+    radius: Optional[int] = None  # 再最適化した近傍の半径（日）。None は月全体
+    changed_cells: List[ShiftRepairCell]
+
+
+class ShiftHintUploadResult(BaseModel):
+    """ウォームスタート用シフト表アップロードの結果"""
+    year: int
+    month: int
+    assignment_count: int
+
+
+class ShiftJob(BaseModel):
+    """シフト生成ジョブの状態と（完了時の）結果"""
+    job_id: str
+    status: JobStatus
+    year: int
+    month: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    run_id: Optional[int] = None  # 保存した確定シフト（ScheduleRun）のID
+    schedule_id: Optional[str] = None  # Excel ダウンロード用のスケジュールID
+    download_url: Optional[str] = None  # 初回アクセス時に Excel を作成する
+    shift_data: Optional[dict] = None
+    cached: bool = False  # キャッシュから返した結果か
+    conflicts: Optional[List[dict]] = None  # 解なし時、原因となった制約（constraint, description, date/staff_id）
+    shortfalls: Optional[List[dict]] = None  # 弾性モードで満たせなかった要件
+
+
+# --- 確定シフト (ScheduleRun) ---
+class ScheduleRun(BaseModel):
+    """保存済みシフトの概要"""
+    id: int
+    year: int
+    month: int
+    version: int
+    source: str
+    is_draft: bool = False
+    created_at: datetime
+    class Config:
+        from_attributes = True
+
+class ScheduleRunDetail(ScheduleRun):
+    """保存済みシフト（表示用データ付き）"""
+    shift_data: dict
+
+class StaffShift(BaseModel):
+    """スタッフ1人の勤務日1日分"""
+    date: date
+    task_id: int
+    task_name: str
 
 
 # --- 月間公休設定 (MonthlyRestDaySetting) ---
@@ -123,6 +290,25 @@ class RequestedDayOffReject(BaseModel):
     rejection_reason: str = Field(..., max_length=500)
     rejected_by: str = Field(..., max_length=100)
 
+class RequestedDayOffBulkStatusUpdate(BaseModel):
+    """Schema for changing the status of multiple day-off requests at once"""
+    request_ids: List[int] = Field(..., min_length=1)
+    status: DayOffStatus
+    acted_by: str = Field("管理者", max_length=100)
+    rejection_reason: Optional[str] = Field(None, max_length=500)  # status=rejected のとき必須
+
+class RequestedDayOffBulkSkip(BaseModel):
+    """一括ステータス変更で対象外になった申請"""
+    id: int
+    reason: str  # not_found / invalid_transition
+    current_status: Optional[str] = None
+
+class RequestedDayOffBulkStatusResult(BaseModel):
+    """一括ステータス変更の結果"""
+    status: DayOffStatus
+    updated_ids: List[int]
+    skipped: List[RequestedDayOffBulkSkip]
+
 class RequestedDayOff(RequestedDayOffBase):
     """Schema for returning a day-off request"""
     id: int
@@ -159,6 +345,8 @@ class HolidayCreate(BaseModel):
     date: str  # YYYY-MM-DD形式
     description: Optional[str] = None
 
+    _check_date = field_validator("date", mode="before")(_iso_date)
+
 class Holiday(HolidayCreate):
     id: int
     class Config:
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from backend.core.config import settings
+from .exporter import ShiftSheet, create_excel_file
+from .inputs import day_in_month
+
+
+def compute_input_hash(staffs, tasks, requirements, absences, holidays, year, month,
+                       additional_days=None, solver_params=None, options=None) -> str:
+    """対象月のソルバー入力を正規化し、内容から一意なハッシュを計算する
+
+    並び順や対象月以外のデータに左右されないよう、対象月分だけを抽出して
+    ソートしたうえで JSON 化する。日付は date でも YYYY-MM-DD 文字列でも同じハッシュになる。
+    solver_params は補完済み（resolved）のものを渡す。
+    options には弾性モードなど、結果に影響する求解オプションを渡す。
+    """
+    def in_month(value):
+        return day_in_month(value, year, month) is not None
+
+    snapshot = {
+        "year": year,
+        "month": month,
+        "staffs": sorted(
+            [s.id, s.name, s.work_limit, s.license_type, s.is_part_time, s.can_only_train, s.is_nurse]
+            for s in staffs
+        ),
+        "tasks": sorted([t.id, t.name] for t in tasks),
+        "requirements": sorted(
+            [str(r.date), r.task_id, r.count] for r in requirements if in_month(r.date)
+        ),
+        "absences": sorted(
+            [a.staff_id, str(a.date)] for a in absences if in_month(a.date)
+        ),
+        "holidays": sorted(str(h.date) for h in (holidays or []) if in_month(h.date)),
+        "additional_days": additional_days,
+        "solver_params": asdict(solver_params) if solver_params is not None else None,
+        "options": options or {},
+    }
+    payload = json.dumps(snapshot, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedSchedule:
+    """求解済みシフト1件分。Excel は初回ダウンロード時に sheet から作成する"""
+    year: int
+    month: int
+    shift_data: dict
+    sheet: ShiftSheet
+    shortfalls: Optional[list] = None
+    excel_path: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+
+
+class ScheduleCache:
+    """スケジュールID（通常は入力ハッシュ）をキーにした求解済みシフトのキャッシュ
+
+    件数上限を超えると最も使われていないものから、ttl_seconds を超えたものは
+    参照時に破棄する。Excel は excel_path で初めて要求されたときに作成して保持する。
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._entries: "OrderedDict[str, CachedSchedule]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._excel_lock = threading.Lock()
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> Optional[CachedSchedule]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._is_expired(entry):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: CachedSchedule) -> bool:
+        """登録できたかを返す（キャッシュ無効時は False）"""
+        if self._max_entries <= 0:
+            return False
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def excel_path(self, key: str) -> Optional[str]:
+        """Excel のパスを返す。未作成（または削除済み）ならここで作成する。キーがなければ None"""
+        entry = self.get(key)
+        if entry is None:
+            return None
+        with self._excel_lock:
+            if entry.excel_path is None or not os.path.exists(entry.excel_path):
+                sheet = entry.sheet
+                entry.excel_path = create_excel_file(
+                    sheet.matrix, sheet.staffs, sheet.tasks, sheet.days, sheet.year, sheet.month, name=key[:16],
+                )
+            return entry.excel_path
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _is_expired(self, entry: CachedSchedule) -> bool:
+        return self._ttl_seconds > 0 and time.time() - entry.created_at > self._ttl_seconds
+
+
+schedule_cache = ScheduleCache(
+    max_entries=settings.SCHEDULE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SCHEDULE_CACHE_TTL_SECONDS,
+)
@@ -1,8 +1,37 @@
 import datetime
-from backend.schemas.enums import TaskCategory, DRIVER_MIN_COUNT
+from collections import defaultdict
+from backend.schemas.enums import DRIVER_MIN_COUNT
+
+# 診断結果で使う制約ファミリーの説明
+CONSTRAINT_DESCRIPTIONS = {
+    "C1": "1日1人1業務まで",
+    "C2": "日次要件の必要人数",
+    "C6": "ドライバーの最低出勤人数",
+    "REST": "月間休日数（土曜日数 + 公休数）",
+    "S1": "月間勤務日数の上限（work_limit）",
+}
+
 
 class ShiftConstraints:
-    def __init__(self, model, shifts, staffs, tasks, days, year, month):
+    """シフト制約を CP-SAT モデルに追加する
+
+    shifts は割り当て可能な (staff_id, day, task_id) のみを持つ疎な辞書。
+    C4, C5, C7〜C11 は eligibility.build_eligibility による変数生成時の
+    枝刈りで表現されるため、ここでは個別の制約を追加しない。
+
+    use_assumptions=True の場合、ハード制約を (ファミリー, 日) または
+    (ファミリー, スタッフ) 単位の仮定リテラルで有効化する。解なしの原因を
+    SufficientAssumptionsForInfeasibility で特定するための診断用。
+
+    elastic=True の場合、C2・C6・月間休日数に上限付きの不足（スラック）変数を入れ、
+    必ず解が得られるようにする。不足数は slack_vars に記録し、目的関数で最小化する。
+
+    add_symmetry_breaking は、属性が同じで希望休もない（入れ替えても解の価値が変わらない）
+    スタッフ同士に辞書式順序の制約を追加し、並べ替えただけの解を探索から除く。
+    """
+
+    def __init__(self, model, shifts, staffs, tasks, days, year, month, use_assumptions=False,
+                 elastic=False):
         self.model = model
         self.shifts = shifts
         self.staffs = staffs
@@ -11,100 +40,85 @@ class ShiftConstraints:
         self.year = year
         self.month = month
 
-    def add_hard_constraints(self, requirements, absences, holidays=None, additional_days=None):
-        """すべてのハード制約（必須ルール）を適用"""
+        # 疎な変数集合を (スタッフ, 日) / (日, 業務) / スタッフ単位で引けるようにしておく
+        self.vars_by_staff_day = defaultdict(list)
+        self.vars_by_day_task = defaultdict(list)
+        self.vars_by_staff = defaultdict(list)
+        for (s_id, d, t_id), var in shifts.items():
+            self.vars_by_staff_day[(s_id, d)].append(var)
+            self.vars_by_day_task[(d, t_id)].append(var)
+            self.vars_by_staff[s_id].append(var)
+
+        # 仮定リテラル: (ファミリー, "day" | "staff", day または staff_id) -> BoolVar
+        self.use_assumptions = use_assumptions
+        self.assumption_literals = {}
+
+        # 弾性モードの不足変数: (種別, キー) -> IntVar
+        self.elastic = elastic
+        self.slack_vars = {}
+        self.required_work_days = None
+
+        # 対称性除去の対象となった同値類（スタッフIDの昇順リストのリスト）
+        self.symmetry_classes = []
+
+    def _slack(self, kind, key, upper_bound):
+        """弾性モードなら 0〜upper_bound の不足変数を作って返す（通常モードでは 0）"""
+        if not self.elastic or upper_bound <= 0:
+            return 0
+        var = self.model.NewIntVar(0, upper_bound, f"slack_{kind}_{key}")
+        self.slack_vars[(kind, key)] = var
+        return var
+
+    def _guard(self, constraint, family, scope, key):
+        """診断モードなら制約を仮定リテラルで有効化する"""
+        if not self.use_assumptions:
+            return
+        label = (family, scope, key)
+        lit = self.assumption_literals.get(label)
+        if lit is None:
+            lit = self.model.NewBoolVar(f"assume_{family}_{scope}{key}")
+            self.assumption_literals[label] = lit
+        constraint.OnlyEnforceIf(lit)
+
+    def add_hard_constraints(self, month_input, additional_days=None):
+        """すべてのハード制約（必須ルール）を適用。month_input は対象月の MonthInput"""
         self._c1_one_task_per_staff()
-        self._c2_daily_requirements(requirements, holidays or [])
+        self._c2_daily_requirements(month_input.requirements, month_input.holiday_days)
         # C3は廃止: 希望休はソフト制約（_s2_absence_requests）に変更
-        self._c4_nurse_exclusive()
-        self._c5_training_exclusive()
-        self._c6_drivers_limit(holidays or [])
-        self._c7_facility_holidays(holidays or [])
-        self._c8_leader_selection()
-        self._c9_vehicle_license_requirement()
-        self._c10_no_driving_for_part_timers()
-        self._c11_training_qualification()
+        # C4, C5, C7〜C11 は変数生成時の枝刈り（eligibility.py）で適用済み
+        self._c6_drivers_limit(month_input.holiday_days)
         if additional_days is not None:
             self._c_monthly_rest_days(additional_days)
 
-    def add_soft_constraints(self, absences=None):
+    def add_soft_constraints(self, month_input=None):
         """努力目標（できれば満たしたいルール）。ペナルティ変数リストを返す"""
         self._s1_work_limit()
         penalties = []
-        if absences:
-            penalties = self._s2_absence_requests(absences)
+        if month_input is not None and month_input.absences:
+            penalties = self._s2_absence_requests(month_input.absences)
         return penalties
 
     def _c1_one_task_per_staff(self):
         """C1: 1日1人1業務まで"""
-        for s in self.staffs:
-            for d in self.days:
-                self.model.Add(sum(self.shifts[(s.id, d, t.id)] for t in self.tasks) <= 1)
-
-    def _c2_daily_requirements(self, requirements, holidays=None):
-        """C2: 日ごとの必要人数を満たす（施設休日はスキップ）"""
-        holiday_days = set()
-        for h in (holidays or []):
-            try:
-                h_date = datetime.datetime.strptime(h.date, "%Y-%m-%d")
-                if h_date.year == self.year and h_date.month == self.month:
-                    holiday_days.add(h_date.day)
-            except ValueError:
-                continue
-
-        req_map = {}
-        for r in requirements:
-            try:
-                r_date = datetime.datetime.strptime(r.date, "%Y-%m-%d")
-                if r_date.year == self.year and r_date.month == self.month:
-                    req_map[(r_date.day, r.task_id)] = r.count
-            except ValueError:
-                continue
+        for (s_id, _), task_vars in self.vars_by_staff_day.items():
+            if len(task_vars) > 1:
+                self._guard(self.model.Add(sum(task_vars) <= 1), "C1", "staff", s_id)
 
+    def _c2_daily_requirements(self, req_map, holiday_days):
+        """C2: 日ごとの必要人数を満たす（施設休日はスキップ）。req_map は (day, task_id) -> count"""
         for d in self.days:
             if d in holiday_days:
                 continue  # 施設休日は要件チェックをスキップ
             for t in self.tasks:
                 if (d, t.id) in req_map:
                     count = req_map[(d, t.id)]
-                    self.model.Add(sum(self.shifts[(s.id, d, t.id)] for s in self.staffs) == count)
-
-    def _c4_nurse_exclusive(self):
-        """C4: 看護業務は看護師のみ"""
-        nurse_tasks = [t for t in self.tasks if TaskCategory.NURSING.value in t.name]
-        non_nurse_staffs = [s for s in self.staffs if not s.is_nurse]
-
-        for task in nurse_tasks:
-            for staff in non_nurse_staffs:
-                for day in self.days:
-                    self.model.Add(self.shifts[(staff.id, day, task.id)] == 0)
-
-    def _c5_training_exclusive(self):
-        """C5: 訓練限定スタッフは訓練のみ"""
-        train_tasks = [t for t in self.tasks if TaskCategory.TRAINING.value in t.name]
-        train_task_ids = {t.id for t in train_tasks}
+                    # 担当可能なスタッフがいない場合は sum([]) == count となり、count > 0 なら解なし
+                    shortage = self._slack("requirement", (d, t.id), count)
+                    ct = self.model.Add(sum(self.vars_by_day_task[(d, t.id)]) + shortage == count)
+                    self._guard(ct, "C2", "day", d)
 
-        training_only_staffs = [s for s in self.staffs if s.can_only_train]
-
-        # 訓練以外のタスクを特定
-        other_tasks = [t for t in self.tasks if t.id not in train_task_ids]
-
-        for staff in training_only_staffs:
-            for task in other_tasks:
-                for day in self.days:
-                    self.model.Add(self.shifts[(staff.id, day, task.id)] == 0)
-
-    def _c6_drivers_limit(self, holidays=None):
+    def _c6_drivers_limit(self, holiday_days):
         """C6: 運転できる人数を確保（施設休日はスキップ）"""
-        holiday_days = set()
-        for h in (holidays or []):
-            try:
-                h_date = datetime.datetime.strptime(h.date, "%Y-%m-%d")
-                if h_date.year == self.year and h_date.month == self.month:
-                    holiday_days.add(h_date.day)
-            except ValueError:
-                continue
-
         # 運転可能かつ常勤のスタッフ
         drivers = [s for s in self.staffs if s.license_type >= 1 and not s.is_part_time]
 
@@ -116,77 +130,10 @@ class ShiftConstraints:
                 # その日働いているドライバーの数
                 working_vars = []
                 for s in drivers:
-                    task_vars = [self.shifts[(s.id, d, t.id)] for t in self.tasks]
-                    working_vars.append(sum(task_vars))
-
-                self.model.Add(sum(working_vars) >= DRIVER_MIN_COUNT)
-
-    def _c7_facility_holidays(self, holidays):
-        """C7: 施設休日は全スタッフの全タスク割り当てを0に強制"""
-        holiday_days = []
-        for h in holidays:
-            try:
-                h_date = datetime.datetime.strptime(h.date, "%Y-%m-%d")
-                if h_date.year == self.year and h_date.month == self.month:
-                    holiday_days.append(h_date.day)
-            except ValueError:
-                continue
+                    working_vars.extend(self.vars_by_staff_day[(s.id, d)])
 
-        for d in holiday_days:
-            for s in self.staffs:
-                for t in self.tasks:
-                    if (s.id, d, t.id) in self.shifts:
-                        self.model.Add(self.shifts[(s.id, d, t.id)] == 0)
-
-    def _c8_leader_selection(self):
-        """C8: リーダー・サブリーダーは相談・看護・介護職（常勤かつ訓練限定でない）のみ"""
-        leader_tasks = [t for t in self.tasks if "リーダー" in t.name or "サブリーダー" in t.name]
-        # パートまたは訓練限定のスタッフは割り当て不可
-        forbidden_staffs = [s for s in self.staffs if s.is_part_time or s.can_only_train]
-
-        for task in leader_tasks:
-            for staff in forbidden_staffs:
-                for day in self.days:
-                    self.model.Add(self.shifts[(staff.id, day, task.id)] == 0)
-
-    def _c9_vehicle_license_requirement(self):
-        """C9: 車種に応じた運転制約"""
-        for task in self.tasks:
-            if "ワゴン" in task.name:
-                # ワゴン可（license_type == 2）のみ許可
-                forbidden = [s for s in self.staffs if s.license_type != 2]
-            elif "普通車" in task.name:
-                # 普通車以上（license_type >= 1）のみ許可
-                forbidden = [s for s in self.staffs if s.license_type < 1]
-            elif "運転" in task.name:
-                # 汎用運転（license_type >= 1）のみ許可
-                forbidden = [s for s in self.staffs if s.license_type < 1]
-            else:
-                continue
-
-            for staff in forbidden:
-                for day in self.days:
-                    self.model.Add(self.shifts[(staff.id, day, task.id)] == 0)
-
-    def _c10_no_driving_for_part_timers(self):
-        """C10: パートスタッフは運転・送迎業務に割り当てない"""
-        driving_tasks = [t for t in self.tasks if "運転" in t.name or "送迎" in t.name]
-        part_time_staffs = [s for s in self.staffs if s.is_part_time]
-
-        for task in driving_tasks:
-            for staff in part_time_staffs:
-                for day in self.days:
-                    self.model.Add(self.shifts[(staff.id, day, task.id)] == 0)
-
-    def _c11_training_qualification(self):
-        """C11: 訓練業務は看護師（is_nurse=True）または訓練限定スタッフ（can_only_train=True）のみ"""
-        train_tasks = [t for t in self.tasks if TaskCategory.TRAINING.value in t.name]
-        unqualified_staffs = [s for s in self.staffs if not s.is_nurse and not s.can_only_train]
-
-        for task in train_tasks:
-            for staff in unqualified_staffs:
-                for day in self.days:
-                    self.model.Add(self.shifts[(staff.id, day, task.id)] == 0)
+                shortage = self._slack("drivers", d, DRIVER_MIN_COUNT)
+                self._guard(self.model.Add(sum(working_vars) + shortage >= DRIVER_MIN_COUNT), "C6", "day", d)
 
     def _c_monthly_rest_days(self, additional_days):
         """月間休日数ハード制約: 各スタッフの月間休日数 = 土曜日数 + 公休数"""
@@ -196,38 +143,133 @@ class ShiftConstraints:
         )
         required_rest_days = saturdays_count + additional_days
         required_work_days = len(self.days) - required_rest_days
+        self.required_work_days = required_work_days
 
         for s in self.staffs:
-            total_work = sum(
-                self.shifts[(s.id, d, t.id)]
-                for d in self.days for t in self.tasks
-            )
-            self.model.Add(total_work == required_work_days)
+            total_work = sum(self.vars_by_staff[s.id])
+            # 弾性モードでは勤務日数の不足・超過の両方を許す
+            under = self._slack("rest_under", s.id, len(self.days))
+            over = self._slack("rest_over", s.id, len(self.days))
+            ct = self.model.Add(total_work + under - over == required_work_days)
+            self._guard(ct, "REST", "staff", s.id)
 
     def _s1_work_limit(self):
         """S1: 勤務日数上限"""
         for s in self.staffs:
-            total_work = sum(self.shifts[(s.id, d, t.id)] for d in self.days for t in self.tasks)
-            self.model.Add(total_work <= s.work_limit)
+            total_work = sum(self.vars_by_staff[s.id])
+            self._guard(self.model.Add(total_work <= s.work_limit), "S1", "staff", s.id)
+
+    def add_symmetry_breaking(self, month_input=None):
+        """入れ替え可能なスタッフの同値類ごとに辞書式順序の対称性除去制約を追加する
+
+        license_type, is_part_time, is_nurse, can_only_train, work_limit が同じで、
+        対象月に希望休がないスタッフは、担当可能な業務も制約も同じなので入れ替えても
+        同じ価値の解になる。ID 順に「前のスタッフの割り当て列 >= 後ろのスタッフの割り当て列」
+        （辞書式）を課す。
+        """
+        requested = month_input.absent_staff_ids if month_input is not None else set()
+
+        classes = defaultdict(list)
+        for s in self.staffs:
+            if s.id in requested:
+                continue
+            key = (s.license_type, s.is_part_time, s.is_nurse, s.can_only_train, s.work_limit)
+            classes[key].append(s.id)
+
+        self.symmetry_classes = [sorted(ids) for ids in classes.values() if len(ids) > 1]
+        for ids in self.symmetry_classes:
+            for a_id, b_id in zip(ids, ids[1:]):
+                self._lex_greater_equal(a_id, b_id)
+        return self.symmetry_classes
+
+    def _lex_greater_equal(self, a_id, b_id):
+        """スタッフ a の割り当て列が b 以上（辞書式）であることを節で表す
+
+        (日, 業務) 順に並べた BoolVar の列 x, y について、前方一致リテラル e を連鎖させ、
+        e[k-1] -> x[k] >= y[k]、e[k-1] かつ x[k] == y[k] -> e[k] を課す。
+        """
+        prefix_equal = None  # None は「空の前方が一致」（常に真）
+        for d in self.days:
+            for t in self.tasks:
+                x = self.shifts.get((a_id, d, t.id))
+                y = self.shifts.get((b_id, d, t.id))
+                if x is None or y is None:
+                    continue
+                guard = [] if prefix_equal is None else [prefix_equal.Not()]
+                self.model.AddBoolOr(guard + [x, y.Not()])
+                next_equal = self.model.NewBoolVar(f"sym_prefix_s{a_id}_s{b_id}_d{d}_t{t.id}")
+                self.model.AddBoolOr(guard + [x.Not(), y.Not(), next_equal])
+                self.model.AddBoolOr(guard + [x, y, next_equal])
+                prefix_equal = next_equal
+
+    def canonicalize_hints(self, hints):
+        """ヒントの割り当てを同値類内で並べ替え、対称性除去の順序を満たす形にする
+
+        同値類のスタッフ全員がヒントにある場合のみ並べ替える。並べ替えの順序は
+        _lex_greater_equal と同じ (日, 業務) 順の 0/1 列の辞書式降順。
+        """
+        hinted_staff_ids = {s_id for s_id, _ in hints}
+        canonical = dict(hints)
+        for ids in self.symmetry_classes:
+            if not all(s_id in hinted_staff_ids for s_id in ids):
+                continue
+            rows = sorted(
+                ([hints.get((s_id, d)) for d in self.days] for s_id in ids),
+                key=lambda row: [t.id == t_id for t_id in row for t in self.tasks],
+                reverse=True,
+            )
+            for s_id, row in zip(ids, rows):
+                for d, t_id in zip(self.days, row):
+                    canonical.pop((s_id, d), None)
+                    if t_id is not None:
+                        canonical[(s_id, d)] = t_id
+        return canonical
+
+    def extract_shortfalls(self, solver):
+        """弾性モードで解いた結果から、満たせなかった要件の一覧を返す"""
+        task_names = {t.id: t.name for t in self.tasks}
+        staff_names = {s.id: s.name for s in self.staffs}
+        shortfalls = []
+        for (kind, key), var in self.slack_vars.items():
+            value = solver.Value(var)
+            if value == 0:
+                continue
+            if kind == "requirement":
+                d, t_id = key
+                shortfalls.append({
+                    "type": kind,
+                    "date": f"{self.year}-{self.month:02d}-{d:02d}",
+                    "task_id": t_id,
+                    "task_name": task_names[t_id],
+                    "shortage": value,
+                })
+            elif kind == "drivers":
+                shortfalls.append({
+                    "type": kind,
+                    "date": f"{self.year}-{self.month:02d}-{key:02d}",
+                    "shortage": value,
+                })
+            else:
+                shortfalls.append({
+                    "type": kind,
+                    "staff_id": key,
+                    "staff_name": staff_names[key],
+                    "required_work_days": self.required_work_days,
+                    # rest_under: 勤務日数が不足（休みが多い）/ rest_over: 勤務日数が超過（休みが少ない）
+                    "difference": value,
+                })
+        return shortfalls
 
     def _s2_absence_requests(self, absences):
-        """S2: 希望休のペナルティ（ソフト制約）- 希望休の日に勤務した場合にペナルティを加算"""
+        """S2: 希望休のペナルティ（ソフト制約）- 希望休の日に勤務した場合にペナルティを加算
+
+        absences は対象月の (staff_id, day) の並び。
+        """
         penalty_vars = []
-        for a in absences:
-            try:
-                a_date = datetime.datetime.strptime(a.date, "%Y-%m-%d")
-                if a_date.year == self.year and a_date.month == self.month:
-                    s_id = a.staff_id
-                    d = a_date.day
-                    task_vars = [
-                        self.shifts[(s_id, d, t.id)]
-                        for t in self.tasks
-                        if (s_id, d, t.id) in self.shifts
-                    ]
-                    if task_vars:
-                        penalty_var = self.model.NewBoolVar(f"absence_penalty_s{s_id}_d{d}")
-                        self.model.AddMaxEquality(penalty_var, task_vars)
-                        penalty_vars.append(penalty_var)
-            except ValueError:
-                continue
+        for s_id, d in absences:
+            task_vars = self.vars_by_staff_day.get((s_id, d))
+            if task_vars:
+                penalty_var = self.model.NewBoolVar(f"absence_penalty_s{s_id}_d{d}")
+                self.model.AddMaxEquality(penalty_var, task_vars)
+                penalty_vars.append(penalty_var)
         return penalty_vars
@@ -0,0 +1,66 @@
+from backend.schemas.enums import TaskCategory
+from .inputs import day_in_month
+
+
+def holiday_days_in_month(holidays, year, month):
+    """施設休日のうち対象年月に含まれる日（day番号）の集合を返す"""
+    days = (day_in_month(h.date, year, month) for h in (holidays or []))
+    return {d for d in days if d is not None}
+
+
+def is_task_allowed(staff, task):
+    """スタッフ属性と業務カテゴリから、そのスタッフが業務を担当できるか判定する
+
+    従来 ShiftConstraints で `== 0` 制約として追加していた C4, C5, C8〜C11 を
+    変数生成前の判定にまとめたもの。
+    """
+    name = task.name
+    is_training = TaskCategory.TRAINING.value in name
+
+    # C4: 看護業務は看護師のみ
+    if TaskCategory.NURSING.value in name and not staff.is_nurse:
+        return False
+
+    # C5: 訓練限定スタッフは訓練のみ
+    if staff.can_only_train and not is_training:
+        return False
+
+    # C8: リーダー・サブリーダーはパート・訓練限定スタッフ不可
+    if "リーダー" in name and (staff.is_part_time or staff.can_only_train):
+        return False
+
+    # C9: 車種に応じた運転制約
+    if "ワゴン" in name:
+        if staff.license_type != 2:
+            return False
+    elif "普通車" in name or "運転" in name:
+        if staff.license_type < 1:
+            return False
+
+    # C10: パートスタッフは運転・送迎業務不可
+    if staff.is_part_time and ("運転" in name or "送迎" in name):
+        return False
+
+    # C11: 訓練業務は看護師または訓練限定スタッフのみ
+    if is_training and not staff.is_nurse and not staff.can_only_train:
+        return False
+
+    return True
+
+
+def build_eligibility(staffs, tasks, days, holiday_days=None):
+    """割り当て可能な (staff_id, day, task_id) の一覧を返す
+
+    スタッフ×業務の可否を一度だけ判定し、C7 の施設休日を除いた日付と組み合わせる。
+    エンジンはこの組み合わせに対してのみ BoolVar を生成する。
+    """
+    holiday_days = holiday_days or set()
+    work_days = [d for d in days if d not in holiday_days]
+
+    eligible = []
+    for s in staffs:
+        allowed_task_ids = [t.id for t in tasks if is_task_allowed(s, t)]
+        for d in work_days:
+            for t_id in allowed_task_ids:
+                eligible.append((s.id, d, t_id))
+    return eligible
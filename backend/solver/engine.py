@@ -1,38 +1,281 @@
 import datetime
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
 from ortools.sat.python import cp_model
-from .constraints import ShiftConstraints
-from .exporter import create_excel_file, extract_shift_data
+from backend.core.config import settings
+from backend.core.logging import get_logger
+from .constraints import ShiftConstraints, CONSTRAINT_DESCRIPTIONS
+from .eligibility import build_eligibility
+from .inputs import MonthInput
+from .exporter import REST, create_excel_file, extract_shift_data, extract_compact_shift_data
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class SolverParams:
+    """CP-SAT の求解パラメータ。未指定の項目は Settings の既定値で補完する"""
+    time_limit_seconds: Optional[float] = None
+    num_workers: Optional[int] = None
+    relative_gap_limit: Optional[float] = None
+    random_seed: Optional[int] = None
+
+    def resolved(self) -> "SolverParams":
+        """Settings の既定値で補完したパラメータを返す"""
+        cpu_count = os.cpu_count() or 1
+        num_workers = self.num_workers if self.num_workers is not None else settings.SOLVER_NUM_WORKERS
+        # 0 は「全コアを使う」の意味。明示的にコア数へ置き換える
+        if num_workers <= 0:
+            num_workers = cpu_count
+        elif num_workers > cpu_count:
+            logger.warning("num_workers=%d は CPU コア数を超えるため %d に制限します", num_workers, cpu_count)
+            num_workers = cpu_count
+        return SolverParams(
+            time_limit_seconds=(
+                self.time_limit_seconds if self.time_limit_seconds is not None
+                else settings.SOLVER_TIME_LIMIT_SECONDS
+            ),
+            num_workers=num_workers,
+            relative_gap_limit=(
+                self.relative_gap_limit if self.relative_gap_limit is not None
+                else settings.SOLVER_RELATIVE_GAP_LIMIT
+            ),
+            random_seed=self.random_seed if self.random_seed is not None else settings.SOLVER_RANDOM_SEED,
+        )
 
-def generate_shift_excel(staffs, tasks, requirements, absences, year, month, holidays=None, additional_days=None):
-    model = cp_model.CpModel()
 
+def apply_solver_params(solver, params: Optional[SolverParams] = None):
+    """CpSolver にパラメータを設定し、実際に使用した値を返す"""
+    params = (params or SolverParams()).resolved()
+    if params.time_limit_seconds > 0:
+        solver.parameters.max_time_in_seconds = params.time_limit_seconds
+    solver.parameters.num_workers = params.num_workers
+    solver.parameters.relative_gap_limit = params.relative_gap_limit
+    solver.parameters.random_seed = params.random_seed
+    return params
+
+
+def month_days(year, month):
+    """対象月の日付（day番号）のリスト"""
     if month == 12:
         next_month = datetime.date(year + 1, 1, 1)
     else:
         next_month = datetime.date(year, month + 1, 1)
     last_day = (next_month - datetime.timedelta(days=1)).day
-    days = list(range(1, last_day + 1))
+    return list(range(1, last_day + 1))
+
+
+def add_solution_hints(model, shifts, hints):
+    """既存の割り当て (staff_id, day) -> task_id を解のヒントとしてモデルに与える
+
+    ヒントに登場しないスタッフ（新規スタッフなど）の変数にはヒントを与えない。
+    """
+    hinted_staff_ids = {s_id for s_id, _ in hints}
+    count = 0
+    for (s_id, d, t_id), var in shifts.items():
+        if s_id in hinted_staff_ids:
+            model.AddHint(var, 1 if hints.get((s_id, d)) == t_id else 0)
+            count += 1
+    return count
 
+
+def read_assignment_matrix(solver, shifts, staffs, tasks, days):
+    """解を一度だけ読み出し、スタッフ × 日 の業務インデックス行列（休みは REST = -1）を返す
+
+    変数ごとに solver.Value を呼ぶ代わりに、レスポンスの解ベクトルを1回取得して参照する。
+    Excel・JSON の各出力はこの行列だけを使う。
+    """
+    solution = solver.ResponseProto().solution
+    staff_index = {s.id: i for i, s in enumerate(staffs)}
+    day_index = {d: i for i, d in enumerate(days)}
+    task_index = {t.id: i for i, t in enumerate(tasks)}
+
+    matrix = [[REST] * len(days) for _ in staffs]
+    for (s_id, d, t_id), var in shifts.items():
+        if solution[var.Index()]:
+            matrix[staff_index[s_id]][day_index[d]] = task_index[t_id]
+    return matrix
+
+
+@dataclass
+class ShiftResult:
+    """求解結果。解が得られなかった場合 excel_path / shift_data は None"""
+    status: int
+    excel_path: Optional[str] = None  # write_excel=False の場合は None
+    shift_data: Optional[dict] = None
+    matrix: Optional[List[List[int]]] = None  # スタッフ × 日 の業務インデックス（休みは REST）
+    conflicts: Optional[List[dict]] = None  # 解なし時の原因（diagnose=True の場合）
+    shortfalls: Optional[List[dict]] = None  # 弾性モードで満たせなかった要件
+
+    @property
+    def feasible(self) -> bool:
+        return self.status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+
+
+def _build_model(staffs, tasks, requirements, absences, year, month, holidays, additional_days,
+                 use_assumptions=False, elastic=False, symmetry_breaking=False):
+    """変数と制約を組み立て、(model, shifts, days, constraints, penalties) を返す"""
+    model = cp_model.CpModel()
+    days = month_days(year, month)
+
+    # 対象月分の入力を一度だけ日番号に変換しておく
+    month_input = MonthInput.from_rows(requirements, absences, holidays, year, month)
+
+    # 担当可能な組み合わせ（C4, C5, C7〜C11 を満たすもの）にのみ変数を生成
     shifts = {}
-    for s in staffs:
-        for d in days:
-            for t in tasks:
-                shifts[(s.id, d, t.id)] = model.NewBoolVar(f"shift_s{s.id}_d{d}_t{t.id}")
+    for s_id, d, t_id in build_eligibility(staffs, tasks, days, month_input.holiday_days):
+        shifts[(s_id, d, t_id)] = model.NewBoolVar(f"shift_s{s_id}_d{d}_t{t_id}")
+
+    constraints = ShiftConstraints(
+        model, shifts, staffs, tasks, days, year, month, use_assumptions=use_assumptions, elastic=elastic,
+    )
+    constraints.add_hard_constraints(month_input, additional_days)
+    penalties = constraints.add_soft_constraints(month_input)
+    if symmetry_breaking:
+        classes = constraints.add_symmetry_breaking(month_input)
+        logger.info(
+            "対称性除去: %d 組の同値類（計 %d 名）", len(classes), sum(len(ids) for ids in classes),
+        )
+    return model, shifts, days, constraints, penalties
+
+
+def diagnose_infeasibility(staffs, tasks, requirements, absences, year, month, holidays=None,
+                           additional_days=None, time_limit_seconds=None, solver=None, should_stop=None):
+    """解なしの原因となるハード制約の組（日・スタッフ単位）を返す
+
+    各ハード制約を仮定リテラル付きで追加して1回求解し、SufficientAssumptionsForInfeasibility
+    で得た十分集合から、1つずつ外しても解なしのままのリテラルを取り除いて極小化する。
+    time_limit_seconds は極小化を含めた全体の制限時間で、各求解には残り時間だけを与える。
+    途中で時間切れになるか should_stop() が真になったら、極小化前の集合をそのまま返す。
+    最初の求解で解がある場合・時間切れの場合は空リストを返す。
+    """
+    model, _, _, constraints, _ = _build_model(
+        staffs, tasks, requirements, absences, year, month, holidays, additional_days, use_assumptions=True,
+    )
+    labels = {lit.Index(): label for label, lit in constraints.assumption_literals.items()}
+    literals = {lit.Index(): lit for lit in constraints.assumption_literals.values()}
+
+    solver = solver or cp_model.CpSolver()
+    time_limit = time_limit_seconds if time_limit_seconds is not None else settings.SOLVER_TIME_LIMIT_SECONDS
+    deadline = time.monotonic() + time_limit if time_limit > 0 else None
+    # 仮定からの原因抽出は単一ワーカーで行う
+    solver.parameters.num_workers = 1
+
+    def out_of_budget():
+        if should_stop is not None and should_stop():
+            return True
+        return deadline is not None and deadline - time.monotonic() <= 0
+
+    def infeasible_core(indexes):
+        if deadline is not None:
+            solver.parameters.max_time_in_seconds = max(deadline - time.monotonic(), 0.0)
+        model.ClearAssumptions()
+        model.AddAssumptions([literals[i] for i in indexes])
+        if solver.Solve(model) != cp_model.INFEASIBLE:
+            return None
+        return [i for i in solver.SufficientAssumptionsForInfeasibility() if i in literals]
 
-    constraints = ShiftConstraints(model, shifts, staffs, tasks, days, year, month)
-    constraints.add_hard_constraints(requirements, absences, holidays or [], additional_days)
-    penalties = constraints.add_soft_constraints(absences)
+    core = infeasible_core(list(literals))
+    if core is None:
+        return []
+
+    # 削除による極小化（時間切れ・キャンセル時はそこまでの集合で打ち切る）
+    i = 0
+    while i < len(core):
+        if out_of_budget():
+            logger.info("解なしの原因の極小化を打ち切りました（残り %d 件は未確認）", len(core) - i)
+            break
+        candidate = core[:i] + core[i + 1:]
+        reduced = infeasible_core(candidate) if candidate else None
+        if reduced is not None:
+            core = [idx for idx in candidate if idx in set(reduced)] or candidate
+        else:
+            i += 1
+
+    conflicts = []
+    for idx in core:
+        family, scope, key = labels[idx]
+        conflict = {"constraint": family, "description": CONSTRAINT_DESCRIPTIONS[family]}
+        if scope == "day":
+            conflict["date"] = f"{year}-{month:02d}-{key:02d}"
+        else:
+            conflict["staff_id"] = key
+        conflicts.append(conflict)
+    logger.info("解なしの原因: %d 件の制約を特定", len(conflicts))
+    return conflicts
+
+
+def solve_shifts(staffs, tasks, requirements, absences, year, month, holidays=None, additional_days=None,
+                 solver_params: Optional[SolverParams] = None, solver=None, hints=None,
+                 diagnose=False, elastic=False, symmetry_breaking: Optional[bool] = None,
+                 write_excel=True, compact=False,
+                 should_stop: Optional[Callable[[], bool]] = None) -> ShiftResult:
+    """シフトを求解し、Excel と表示用データを含む ShiftResult を返す
+
+    solver を渡すと、その CpSolver で求解する（別スレッドから StopSearch で中断するため）。
+    hints に前回の割り当て (staff_id, day) -> task_id を渡すとウォームスタートする。
+    diagnose=True の場合、解なし（INFEASIBLE）なら原因となる制約の組を conflicts に入れる。
+    elastic=True の場合、必要人数・ドライバー数・月間休日数の不足を許して必ず解を返し、
+    不足分を shortfalls に入れる。
+    symmetry_breaking で入れ替え可能なスタッフの対称性除去を切り替える（None なら Settings の既定値）。
+    write_excel=False の場合は Excel を出力せず、後から matrix で作成できるようにする。
+    compact=True の場合、shift_data を extract_compact_shift_data 形式で返す。
+    should_stop は原因診断の途中で打ち切るかを返す関数（ジョブのキャンセル確認用）。
+    """
+    if symmetry_breaking is None:
+        symmetry_breaking = settings.SOLVER_SYMMETRY_BREAKING
+    model, shifts, days, constraints, penalties = _build_model(
+        staffs, tasks, requirements, absences, year, month, holidays, additional_days, elastic=elastic,
+        symmetry_breaking=symmetry_breaking,
+    )
 
     # 希望休違反ペナルティを最小化
-    if penalties:
-        model.Minimize(sum(penalties))
+    # 弾性モードの不足は、希望休違反をすべて合わせたより重く扱う
+    slack_weight = len(penalties) + 1
+    objective = sum(penalties) + slack_weight * sum(constraints.slack_vars.values())
+    if penalties or constraints.slack_vars:
+        model.Minimize(objective)
 
-    solver = cp_model.CpSolver()
+    if hints:
+        # 対称性除去で禁じた並びのヒントは無駄になるため、同値類内で並べ替えてから与える
+        if constraints.symmetry_classes:
+            hints = constraints.canonicalize_hints(hints)
+        hinted = add_solution_hints(model, shifts, hints)
+        logger.info("ウォームスタート: %d 変数にヒントを設定", hinted)
+
+    solver = solver or cp_model.CpSolver()
+    params = apply_solver_params(solver, solver_params)
     status = solver.Solve(model)
+    logger.info(
+        "求解終了: %s (%.2f秒, workers=%d, time_limit=%.1f秒, gap=%.3f, seed=%d)",
+        solver.StatusName(status), solver.WallTime(), params.num_workers,
+        params.time_limit_seconds, params.relative_gap_limit, params.random_seed,
+    )
 
-    if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
-        excel_path = create_excel_file(solver, shifts, staffs, tasks, days, year, month)
-        shift_data = extract_shift_data(solver, shifts, staffs, tasks, days, year, month)
-        return excel_path, shift_data
-    else:
-        return None, None
\ No newline at end of file
+    result = ShiftResult(status)
+    if result.feasible:
+        result.matrix = read_assignment_matrix(solver, shifts, staffs, tasks, days)
+        if write_excel:
+            result.excel_path = create_excel_file(result.matrix, staffs, tasks, days, year, month)
+        extract = extract_compact_shift_data if compact else extract_shift_data
+        result.shift_data = extract(result.matrix, staffs, tasks, days, year, month)
+        if elastic:
+            result.shortfalls = constraints.extract_shortfalls(solver)
+    elif diagnose and status == cp_model.INFEASIBLE:
+        result.conflicts = diagnose_infeasibility(
+            staffs, tasks, requirements, absences, year, month, holidays, additional_days,
+            time_limit_seconds=params.time_limit_seconds, solver=solver, should_stop=should_stop,
+        )
+    return result
+
+
+def generate_shift_excel(staffs, tasks, requirements, absences, year, month, holidays=None, additional_days=None,
+                         solver_params: Optional[SolverParams] = None, solver=None, hints=None):
+    """シフトを求解し、(Excelパス, 表示用データ) を返す。解なしの場合は (None, None)"""
+    result = solve_shifts(
+        staffs, tasks, requirements, absences, year, month, holidays, additional_days,
+        solver_params=solver_params, solver=solver, hints=hints,
+    )
+    return result.excel_path, result.shift_data
@@ -1,114 +1,152 @@
 import os
 import datetime
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
 from openpyxl import Workbook
-from openpyxl.styles import Alignment, PatternFill, Font, Border, Side
-
-def create_excel_file(solver, shifts, staffs, tasks, days, year, month):
-    """シフト表をExcel出力する（縦：職員名、横：日付、セル：業務名）"""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = f"{month}月シフト"
-
-    font_header = Font(bold=True, color="FFFFFF")
-    font_staff = Font(bold=True)
-    fill_header = PatternFill("solid", fgColor="007BFF")
-    fill_rest = PatternFill("solid", fgColor="DDDDDD")
-    fill_staff_col = PatternFill("solid", fgColor="F0F4FF")
-    center = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin'),
-    )
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, PatternFill, Font, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
 
-    # ヘッダー行: 「氏名/日付」+ 日付列
-    header_cell = ws.cell(row=1, column=1, value="氏名 \\ 日付")
-    header_cell.font = font_header
-    header_cell.fill = fill_header
-    header_cell.alignment = center
-    header_cell.border = thin_border
-    ws.column_dimensions['A'].width = 14
-
-    for i, d in enumerate(days):
-        col = i + 2
-        date_obj = datetime.date(year, month, d)
-        weekday_names = ["月", "火", "水", "木", "金", "土", "日"]
-        weekday = weekday_names[date_obj.weekday()]
-        c = ws.cell(row=1, column=col, value=f"{d}日\n({weekday})")
-        c.font = font_header
-        c.fill = fill_header
-        c.alignment = center
-        c.border = thin_border
-        ws.column_dimensions[c.column_letter].width = 8
+# 割り当て行列で休みを表す値
+REST = -1
 
-    # スタッフ行: スタッフ名 + 各日の業務名
-    for row_idx, s in enumerate(staffs, start=2):
-        # スタッフ名セル
-        name_cell = ws.cell(row=row_idx, column=1, value=s.name)
-        name_cell.font = font_staff
-        name_cell.fill = fill_staff_col
-        name_cell.alignment = center
-        name_cell.border = thin_border
-
-        for col_idx, d in enumerate(days, start=2):
-            # この日に割り当てられた業務を検索
-            task_name = ""
-            for t in tasks:
-                if solver.Value(shifts[(s.id, d, t.id)]) == 1:
-                    task_name = t.name
-                    break
-
-            cell = ws.cell(row=row_idx, column=col_idx, value=task_name if task_name else "休")
-            cell.alignment = center
-            cell.border = thin_border
-
-            if not task_name:
-                cell.fill = fill_rest
+REST_LABEL = "休"
+WEEKDAY_NAMES = ["月", "火", "水", "木", "金", "土", "日"]
 
-        ws.row_dimensions[row_idx].height = 20
 
+@dataclass
+class ShiftSheet:
+    """ブックに書き出す1シート分のシフト（1か月・1施設）"""
+    matrix: List[List[int]]  # engine.read_assignment_matrix の スタッフ × 日 の業務インデックス
+    staffs: list
+    tasks: list
+    days: List[int]
+    year: int
+    month: int
+    title: Optional[str] = None  # 未指定なら「{month}月シフト」
+
+
+def _thin_border():
+    side = Side(style="thin")
+    return Border(left=side, right=side, top=side, bottom=side)
+
+
+def _shift_styles():
+    """セルごとに Font/Fill などを作らず、ブック共通の名前付きスタイルとして定義する"""
+    center = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    return [
+        NamedStyle(
+            name="shift_header", font=Font(bold=True, color="FFFFFF"),
+            fill=PatternFill("solid", fgColor="007BFF"), alignment=center, border=_thin_border(),
+        ),
+        NamedStyle(
+            name="shift_staff", font=Font(bold=True),
+            fill=PatternFill("solid", fgColor="F0F4FF"), alignment=center, border=_thin_border(),
+        ),
+        NamedStyle(name="shift_task", alignment=center, border=_thin_border()),
+        NamedStyle(
+            name="shift_rest", fill=PatternFill("solid", fgColor="DDDDDD"), alignment=center, border=_thin_border(),
+        ),
+    ]
+
+
+def _styled(ws, value, style):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+
+def _write_sheet(wb, sheet: ShiftSheet):
+    ws = wb.create_sheet(sheet.title or f"{sheet.month}月シフト")
+
+    # 書き込み専用モードでは行を追加する前に列幅・行高を決めておく
+    ws.column_dimensions["A"].width = 14
+    for col in range(2, len(sheet.days) + 2):
+        ws.column_dimensions[get_column_letter(col)].width = 8
     ws.row_dimensions[1].height = 28
+    for row_idx in range(2, len(sheet.staffs) + 2):
+        ws.row_dimensions[row_idx].height = 20
 
+    # ヘッダー行: 「氏名/日付」+ 日付列
+    header = [_styled(ws, "氏名 \\ 日付", "shift_header")]
+    for d in sheet.days:
+        weekday = WEEKDAY_NAMES[datetime.date(sheet.year, sheet.month, d).weekday()]
+        header.append(_styled(ws, f"{d}日\n({weekday})", "shift_header"))
+    ws.append(header)
+
+    # スタッフ行: スタッフ名 + 各日の業務名
+    task_names = [t.name for t in sheet.tasks]
+    for s, row in zip(sheet.staffs, sheet.matrix):
+        cells = [_styled(ws, s.name, "shift_staff")]
+        for t_idx in row:
+            if t_idx == REST:
+                cells.append(_styled(ws, REST_LABEL, "shift_rest"))
+            else:
+                cells.append(_styled(ws, task_names[t_idx], "shift_task"))
+        ws.append(cells)
+
+
+def write_shift_workbook(target, sheets: Iterable[ShiftSheet]):
+    """シフト表を書き込み専用モードのブックとして target に書き出す
+
+    target はファイルパスまたはバイナリのファイルオブジェクト（一時ファイル・レスポンス用バッファなど）。
+    sheets を複数渡すと、月・施設ごとのシートを持つ1つのブックになる。
+    行はシートごとに逐次書き出すため、全セルをメモリに保持しない。
+    """
+    wb = Workbook(write_only=True)
+    for style in _shift_styles():
+        wb.add_named_style(style)
+    for sheet in sheets:
+        _write_sheet(wb, sheet)
+    wb.save(target)
+
+
+def create_excel_file(matrix, staffs, tasks, days, year, month, name=None):
+    """シフト表をExcel出力する（縦：職員名、横：日付、セル：業務名）
+
+    matrix は engine.read_assignment_matrix の スタッフ × 日 の業務インデックス（休みは REST）。
+    static/shift_{year}_{month}_{name}.xlsx に保存し、そのパスを返す（name の既定は時刻）。
+    """
     if not os.path.exists("static"):
         os.makedirs("static")
 
-    filename = f"static/shift_{year}_{month}_{datetime.datetime.now().strftime('%H%M%S')}.xlsx"
-    wb.save(filename)
+    name = name or datetime.datetime.now().strftime('%H%M%S')
+    filename = f"static/shift_{year}_{month}_{name}.xlsx"
+    write_shift_workbook(filename, [ShiftSheet(matrix, staffs, tasks, days, year, month)])
     return filename
 
-def extract_shift_data(solver, shifts, staffs, tasks, days, year, month):
+def extract_shift_data(matrix, staffs, tasks, days, year, month):
     """フロントエンド表示用にJSONデータを抽出。by_date形式とby_staff形式の両方を返す"""
-    # カレンダー表示用: 日付ごとのアサインリスト
+    date_strs = [f"{year}-{month:02d}-{d:02d}" for d in days]
+
+    # カレンダー表示用: 日付ごとのアサインリスト（業務順、同じ業務内はスタッフ順）
     by_date = {}
-    for d in days:
-        date_str = f"{year}-{month:02d}-{d:02d}"
-        assignments = []
-        for t in tasks:
-            for s in staffs:
-                if solver.Value(shifts[(s.id, d, t.id)]) == 1:
-                    assignments.append({
-                        "staffId": s.id,
-                        "staffName": s.name,
-                        "taskId": t.id,
-                        "taskName": t.name,
-                        "isNurse": s.is_nurse,
-                    })
-        if assignments:
-            by_date[date_str] = assignments
+    for day_idx, date_str in enumerate(date_strs):
+        assigned = sorted(
+            (row[day_idx], s_idx) for s_idx, row in enumerate(matrix) if row[day_idx] != REST
+        )
+        if assigned:
+            by_date[date_str] = [
+                {
+                    "staffId": staffs[s_idx].id,
+                    "staffName": staffs[s_idx].name,
+                    "taskId": tasks[t_idx].id,
+                    "taskName": tasks[t_idx].name,
+                    "isNurse": staffs[s_idx].is_nurse,
+                }
+                for t_idx, s_idx in assigned
+            ]
 
     # テーブル表示用: スタッフごとの日別業務名
+    task_names = [t.name for t in tasks]
     by_staff = []
-    for s in staffs:
-        staff_shifts = {}
-        for d in days:
-            date_str = f"{year}-{month:02d}-{d:02d}"
-            task_name = ""
-            for t in tasks:
-                if solver.Value(shifts[(s.id, d, t.id)]) == 1:
-                    task_name = t.name
-                    break
-            staff_shifts[date_str] = task_name  # 空文字は休み
+    for s, row in zip(staffs, matrix):
+        # 空文字は休み
+        staff_shifts = {
+            date_str: task_names[t_idx] if t_idx != REST else ""
+            for date_str, t_idx in zip(date_strs, row)
+        }
 
         by_staff.append({
             "staffId": s.id,
@@ -120,3 +158,22 @@ def extract_shift_data(solver, shifts, staffs, tasks, days, year, month):
         "by_date": by_date,
         "by_staff": by_staff,
     }
+
+
+def extract_compact_shift_data(matrix, staffs, tasks, days, year, month):
+    """extract_shift_data のコンパクト版。スタッフ・業務の一覧を1回ずつと、スタッフ × 日 の業務インデックス行列を返す
+
+    matrix[i][j] は staffs[i] の dates[j] の業務（tasks のインデックス、休みは REST = -1）。
+    by_date / by_staff はフロントエンド側でこの行列から組み立てる。
+    """
+    return {
+        "format": "compact",
+        "dates": [f"{year}-{month:02d}-{d:02d}" for d in days],
+        "staffs": [{"id": s.id, "name": s.name, "isNurse": s.is_nurse} for s in staffs],
+        "tasks": [{"id": t.id, "name": t.name} for t in tasks],
+        "matrix": matrix,
+    }
+
+
+def is_compact_shift_data(shift_data) -> bool:
+    return bool(shift_data) and shift_data.get("format") == "compact"
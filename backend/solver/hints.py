@@ -0,0 +1,145 @@
+import datetime
+import threading
+from typing import Dict, Optional, Tuple
+
+from openpyxl import load_workbook
+
+from .exporter import REST, REST_LABEL
+
+# (staff_id, day) -> task_id。休みの日はキーを持たない
+Assignments = Dict[Tuple[int, int], int]
+
+
+def assignments_from_shift_data(shift_data: dict) -> Assignments:
+    """extract_shift_data の by_date から割り当てを復元する"""
+    assignments = {}
+    for date_str, items in shift_data.get("by_date", {}).items():
+        day = int(date_str[-2:])
+        for item in items:
+            assignments[(item["staffId"], day)] = item["taskId"]
+    return assignments
+
+
+def assignments_from_matrix(matrix, staffs, tasks, days) -> Assignments:
+    """スタッフ × 日 の業務インデックス行列から割り当てを復元する"""
+    return {
+        (s.id, d): tasks[t_idx].id
+        for s, row in zip(staffs, matrix)
+        for d, t_idx in zip(days, row) if t_idx != REST
+    }
+
+
+def assignments_to_matrix(assignments: Assignments, staffs, tasks, days):
+    """割り当てを スタッフ × 日 の業務インデックス行列（休みは REST）に変換する"""
+    task_index = {t.id: i for i, t in enumerate(tasks)}
+    return [
+        [task_index.get(assignments.get((s.id, d)), REST) for d in days]
+        for s in staffs
+    ]
+
+
+def read_excel_assignments(file, staffs, tasks) -> Assignments:
+    """create_excel_file 形式のシフト表（縦：職員名、横：日付、セル：業務名）から割り当てを読み込む
+
+    職員名・業務名で ID を引くため、同名が複数ある場合や見つからない場合はその行・セルを無視する。
+    """
+    staff_ids = _unique_name_map(staffs)
+    task_ids = _unique_name_map(tasks)
+
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return {}
+
+        # ヘッダー「1日\n(月)」から日付列を特定
+        day_columns = {}
+        for col, value in enumerate(header):
+            if col == 0 or not isinstance(value, str) or "日" not in value:
+                continue
+            try:
+                day_columns[col] = int(value.split("日")[0])
+            except ValueError:
+                continue
+
+        assignments = {}
+        for row in rows:
+            if not row or row[0] not in staff_ids:
+                continue
+            s_id = staff_ids[row[0]]
+            for col, day in day_columns.items():
+                value = row[col] if col < len(row) else None
+                if value and value != REST_LABEL and value in task_ids:
+                    assignments[(s_id, day)] = task_ids[value]
+        return assignments
+    finally:
+        wb.close()
+
+
+def shift_to_month(assignments: Assignments, src_year, src_month, year, month) -> Assignments:
+    """前月の割り当てを曜日を揃えて対象月へ写す
+
+    対象月の各日について4週前（まだ対象月内なら5週前）の前月の日付を参照する。
+    """
+    first = datetime.date(year, month, 1)
+    shifted = {}
+    by_day = {}
+    for (s_id, d), t_id in assignments.items():
+        by_day.setdefault(d, []).append((s_id, t_id))
+
+    day = first
+    while day.month == month:
+        src = day - datetime.timedelta(weeks=4)
+        if src >= first:
+            src -= datetime.timedelta(weeks=1)
+        if (src.year, src.month) == (src_year, src_month):
+            for s_id, t_id in by_day.get(src.day, []):
+                shifted[(s_id, day.day)] = t_id
+        day += datetime.timedelta(days=1)
+    return shifted
+
+
+def _unique_name_map(items):
+    counts = {}
+    for item in items:
+        counts[item.name] = counts.get(item.name, 0) + 1
+    return {item.name: item.id for item in items if counts[item.name] == 1}
+
+
+class HintStore:
+    """月ごとに直近の確定シフト（割り当て）を保持し、ウォームスタートのヒントとして提供する"""
+
+    def __init__(self):
+        self._assignments: Dict[Tuple[int, int], Assignments] = {}
+        self._lock = threading.Lock()
+
+    def put(self, year: int, month: int, assignments: Assignments):
+        with self._lock:
+            self._assignments[(year, month)] = assignments
+
+    def get(self, year: int, month: int) -> Optional[Assignments]:
+        """対象月の直近の確定シフトを返す"""
+        with self._lock:
+            return self._assignments.get((year, month))
+
+    def find(self, year: int, month: int, load=None) -> Optional[Assignments]:
+        """同じ月の前回結果、なければ前月の結果を曜日を揃えて返す
+
+        load を渡すと、保持していない月は load(year, month)（DB の保存済みシフトなど）から取得する。
+        """
+        prev_year, prev_month = (year - 1, 12) if month == 1 else (year, month - 1)
+        with self._lock:
+            same = self._assignments.get((year, month))
+            prev = self._assignments.get((prev_year, prev_month))
+        if load is not None:
+            same = same or load(year, month)
+            prev = prev or (None if same else load(prev_year, prev_month))
+        if same:
+            return same
+        if prev:
+            return shift_to_month(prev, prev_year, prev_month, year, month)
+        return None
+
+
+hint_store = HintStore()
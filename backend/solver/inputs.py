@@ -0,0 +1,51 @@
+import datetime
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+
+def day_in_month(value, year, month) -> Optional[int]:
+    """日付（date または "YYYY-MM-DD"）が対象年月なら日番号を、そうでなければ None を返す"""
+    if isinstance(value, str):
+        try:
+            value = datetime.datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            return None
+    if value is None or value.year != year or value.month != month:
+        return None
+    return value.day
+
+
+@dataclass
+class MonthInput:
+    """対象月分だけに絞り込み、日付を日番号に変換したソルバー入力
+
+    制約ごとに日付を解析し直さないよう、モデル構築前に from_rows で一度だけ作る。
+    """
+    year: int
+    month: int
+    requirements: Dict[Tuple[int, int], int] = field(default_factory=dict)  # (day, task_id) -> count
+    holiday_days: Set[int] = field(default_factory=set)
+    absences: List[Tuple[int, int]] = field(default_factory=list)  # (staff_id, day)
+
+    @classmethod
+    def from_rows(cls, requirements, absences, holidays, year, month) -> "MonthInput":
+        """DailyRequirement / 希望休 / Holiday の行から対象月分を取り出す（他の月の行は無視する）"""
+        month_input = cls(year, month)
+        for r in requirements or []:
+            d = day_in_month(r.date, year, month)
+            if d is not None:
+                month_input.requirements[(d, r.task_id)] = r.count
+        for h in holidays or []:
+            d = day_in_month(h.date, year, month)
+            if d is not None:
+                month_input.holiday_days.add(d)
+        for a in absences or []:
+            d = day_in_month(a.date, year, month)
+            if d is not None:
+                month_input.absences.append((a.staff_id, d))
+        return month_input
+
+    @property
+    def absent_staff_ids(self) -> Set[int]:
+        """対象月に希望休があるスタッフ"""
+        return {s_id for s_id, _ in self.absences}
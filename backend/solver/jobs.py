@@ -0,0 +1,172 @@
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Optional
+
+from ortools.sat.python import cp_model
+
+from backend.core.config import settings
+from backend.core.logging import get_logger
+from backend.schemas.enums import JobStatus
+
+logger = get_logger(__name__)
+
+FINISHED_STATUSES = {JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+
+class JobError(Exception):
+    """ジョブが結果を出せずに終了したことを表す（メッセージはそのまま利用者に返す）
+
+    result を渡すと、失敗したジョブの結果（解なしの原因など）として保持する。
+    """
+
+    def __init__(self, message: str, result: Optional[dict] = None):
+        super().__init__(message)
+        self.result = result
+
+
+class ShiftJob:
+    """シフト生成ジョブ1件分の状態
+
+    solver は実行中の求解を外部スレッドから StopSearch で止めるために保持する。
+    """
+
+    def __init__(self, year: int, month: int):
+        self.id = uuid.uuid4().hex
+        self.year = year
+        self.month = month
+        self.status = JobStatus.QUEUED
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.solver = cp_model.CpSolver()
+        self.cancel_requested = False
+        self.future = None
+
+    def to_dict(self) -> dict:
+        data = {
+            "job_id": self.id,
+            "status": self.status.value,
+            "year": self.year,
+            "month": self.month,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+        if self.result:
+            data.update(self.result)
+        return data
+
+
+class JobManager:
+    """上限付きスレッドプールでシフト生成ジョブを実行し、その状態を保持する
+
+    状態はプロセス内メモリに保持する。完了済みジョブは新しい順に
+    max_retained 件まで残し、古いものから破棄する。
+    """
+
+    def __init__(self, max_workers: int, max_retained: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shift-job")
+        self._jobs: "OrderedDict[str, ShiftJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_retained = max_retained
+
+    def submit(self, year: int, month: int, fn: Callable[[ShiftJob], Optional[dict]]) -> ShiftJob:
+        """ジョブを登録してバックグラウンド実行を開始する
+
+        fn は成功時にレスポンス用の dict を返し、解が見つからなければ
+        JobError を送出する。
+        """
+        job = ShiftJob(year, month)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict_finished()
+        job.future = self._executor.submit(self._run, job, fn)
+        return job
+
+    def complete(self, year: int, month: int, result: dict) -> ShiftJob:
+        """求解せずに結果が得られた場合（キャッシュヒットなど）、完了済みジョブとして登録する"""
+        job = ShiftJob(year, month)
+        job.result = result
+        self._finish(job, JobStatus.SUCCEEDED)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict_finished()
+        return job
+
+    def get(self, job_id: str) -> Optional[ShiftJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[ShiftJob]:
+        """ジョブをキャンセルする。実行中の場合は求解を打ち切る"""
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return job
+
+        job.cancel_requested = True
+        if job.future is not None and job.future.cancel():
+            # まだ開始していなかった
+            self._finish(job, JobStatus.CANCELLED)
+        else:
+            job.solver.StopSearch()
+        return job
+
+    def shutdown(self):
+        """未完了ジョブをすべてキャンセルしてスレッドプールを停止する"""
+        with self._lock:
+            job_ids = list(self._jobs.keys())
+        for job_id in job_ids:
+            self.cancel(job_id)
+        self._executor.shutdown(wait=True)
+
+    def _run(self, job: ShiftJob, fn: Callable[[ShiftJob], Optional[dict]]):
+        if job.cancel_requested:
+            self._finish(job, JobStatus.CANCELLED)
+            return
+
+        job.status = JobStatus.RUNNING
+        job.started_at = datetime.utcnow()
+        logger.info("ジョブ開始: %s (%d年%d月)", job.id, job.year, job.month)
+        try:
+            result = fn(job)
+        except JobError as exc:
+            status = JobStatus.CANCELLED if job.cancel_requested else JobStatus.FAILED
+            job.result = exc.result
+            self._finish(job, status, error=str(exc))
+            return
+        except Exception as exc:
+            logger.error("ジョブ失敗: %s: %s", job.id, exc, exc_info=True)
+            self._finish(job, JobStatus.FAILED, error="Internal Server Error")
+            return
+
+        if job.cancel_requested:
+            self._finish(job, JobStatus.CANCELLED)
+        else:
+            job.result = result
+            self._finish(job, JobStatus.SUCCEEDED)
+
+    def _finish(self, job: ShiftJob, status: JobStatus, error: Optional[str] = None):
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        logger.info("ジョブ終了: %s -> %s", job.id, status.value)
+
+    def _evict_finished(self):
+        """保持件数を超えた完了済みジョブを古い順に破棄する（ロック取得済みで呼ぶ）"""
+        overflow = len(self._jobs) - self._max_retained
+        if overflow <= 0:
+            return
+        for job_id in [j.id for j in self._jobs.values() if j.status in FINISHED_STATUSES][:overflow]:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager(
+    max_workers=settings.SHIFT_JOB_MAX_WORKERS,
+    max_retained=settings.SHIFT_JOB_MAX_RETAINED,
+)
@@ -0,0 +1,162 @@
+import datetime
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+from backend.schemas.enums import DRIVER_MIN_COUNT
+from .eligibility import is_task_allowed
+from .inputs import MonthInput
+
+
+@dataclass
+class FeasibilityIssue:
+    """モデル構築前に検出した、解が存在しないことが確定する不足"""
+    kind: str           # task_short / day_short / drivers_short / staff_work_days / monthly_capacity
+    message: str
+    date: Optional[str] = None
+    task_id: Optional[int] = None
+    staff_id: Optional[int] = None
+    required: Optional[int] = None
+    available: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _max_matching(staff_ids: List[int], slots: List[int], allowed: Dict[int, set]) -> List[Optional[int]]:
+    """スタッフを業務枠に割り当てる最大マッチング（増加路法）
+
+    slots は枠ごとの task_id の並び。戻り値は枠ごとに割り当てたスタッフID（未充足は None）。
+    """
+    slot_owner: List[Optional[int]] = [None] * len(slots)
+    slots_by_task: Dict[int, List[int]] = {}
+    for i, t_id in enumerate(slots):
+        slots_by_task.setdefault(t_id, []).append(i)
+
+    def augment(s_id, visited):
+        for t_id in allowed[s_id]:
+            for i in slots_by_task.get(t_id, []):
+                if i in visited:
+                    continue
+                visited.add(i)
+                if slot_owner[i] is None or augment(slot_owner[i], visited):
+                    slot_owner[i] = s_id
+                    return True
+        return False
+
+    for s_id in staff_ids:
+        augment(s_id, set())
+    return slot_owner
+
+
+def check_feasibility(staffs, tasks, requirements, year, month, days, holidays=None,
+                      additional_days=None) -> List[FeasibilityIssue]:
+    """ShiftConstraints でモデルを組む前に、明らかに解が存在しない入力を検出する
+
+    すべて必要条件のチェックなので、ここで問題がなくても解があるとは限らない。
+    - 業務ごとの必要人数 > 担当可能なスタッフ数（日・業務単位）
+    - 日ごとのスタッフ→業務枠の最大マッチングが必要人数に届かない
+    - C6 のドライバー数を満たせない
+    - 月間勤務日数（土曜日数 + 公休数から決まる日数）と work_limit・必要人数の総量が合わない
+    """
+    issues: List[FeasibilityIssue] = []
+    task_names = {t.id: t.name for t in tasks}
+    allowed = {s.id: {t.id for t in tasks if is_task_allowed(s, t)} for s in staffs}
+    month_input = MonthInput.from_rows(requirements, [], holidays, year, month)
+    holiday_days = month_input.holiday_days
+    work_days = [d for d in days if d not in holiday_days]
+
+    req_map: Dict[int, Dict[int, int]] = {}
+    for (d, t_id), count in month_input.requirements.items():
+        if t_id in task_names:
+            req_map.setdefault(d, {})[t_id] = count
+
+    drivers = [s.id for s in staffs if s.license_type >= 1 and not s.is_part_time]
+    staff_ids = [s.id for s in staffs]
+    day_capacity = {}
+
+    for d in work_days:
+        date_str = f"{year}-{month:02d}-{d:02d}"
+        day_reqs = req_map.get(d, {})
+
+        # 業務ごとの担当可能人数
+        short_tasks = set()
+        for t_id, count in day_reqs.items():
+            available = sum(1 for s_id in staff_ids if t_id in allowed[s_id])
+            if available < count:
+                short_tasks.add(t_id)
+                issues.append(FeasibilityIssue(
+                    "task_short",
+                    f"{date_str} {task_names[t_id]}: 必要 {count} 名に対し担当可能なスタッフは {available} 名です",
+                    date=date_str, task_id=t_id, required=count, available=available,
+                ))
+
+        # 日単位の最大マッチング（1人1業務で必要枠を埋められるか）
+        slots = [t_id for t_id, count in day_reqs.items() for _ in range(count)]
+        owners = _max_matching(staff_ids, slots, allowed)
+        unfilled = {}
+        for t_id, owner in zip(slots, owners):
+            if owner is None:
+                unfilled[t_id] = unfilled.get(t_id, 0) + 1
+        for t_id, missing in unfilled.items():
+            if t_id in short_tasks:
+                continue  # 担当可能人数の不足として報告済み
+            issues.append(FeasibilityIssue(
+                "day_short",
+                f"{date_str} {task_names[t_id]}: 他業務との兼ね合いで {missing} 名不足します"
+                f"（必要人数の合計 {len(slots)} 名）",
+                date=date_str, task_id=t_id, required=day_reqs[t_id], available=day_reqs[t_id] - missing,
+            ))
+
+        # 必要人数の指定がない業務は上限なしとして、その日に働ける延べ人数の上限を求める
+        unbounded = [t.id for t in tasks if t.id not in day_reqs]
+        day_capacity[d] = None if unbounded else len(slots)
+
+        # C6: ドライバーが DRIVER_MIN_COUNT 人以上働けるか
+        if len(drivers) >= DRIVER_MIN_COUNT:
+            driver_slots = slots + [t_id for t_id in unbounded for _ in range(len(drivers))]
+            placed = sum(1 for owner in _max_matching(drivers, driver_slots, allowed) if owner is not None)
+            if placed < DRIVER_MIN_COUNT:
+                issues.append(FeasibilityIssue(
+                    "drivers_short",
+                    f"{date_str}: 出勤できるドライバーが {placed} 名で、最低 {DRIVER_MIN_COUNT} 名に足りません",
+                    date=date_str, required=DRIVER_MIN_COUNT, available=placed,
+                ))
+
+    # 月間の勤務日数
+    total_demand = sum(sum(day_reqs.values()) for d, day_reqs in req_map.items() if d not in holiday_days)
+    if additional_days is not None:
+        saturdays = sum(1 for d in days if datetime.date(year, month, d).weekday() == 5)
+        required_work_days = len(days) - saturdays - additional_days
+        for s in staffs:
+            workable = len(work_days) if allowed[s.id] else 0
+            limit = min(s.work_limit, workable)
+            if required_work_days < 0 or required_work_days > limit:
+                issues.append(FeasibilityIssue(
+                    "staff_work_days",
+                    f"{s.name}: 月間勤務日数 {required_work_days} 日に対し、勤務可能な日数は {limit} 日です",
+                    staff_id=s.id, required=required_work_days, available=limit,
+                ))
+        total_work = required_work_days * len(staffs)
+        capacity = None if any(c is None for c in day_capacity.values()) else sum(day_capacity.values())
+        if total_work < total_demand:
+            issues.append(FeasibilityIssue(
+                "monthly_capacity",
+                f"必要人数の月合計 {total_demand} 名に対し、全スタッフの勤務日数の合計は {total_work} 日です",
+                required=total_demand, available=total_work,
+            ))
+        elif capacity is not None and total_work > capacity:
+            issues.append(FeasibilityIssue(
+                "monthly_capacity",
+                f"全スタッフの勤務日数の合計 {total_work} 日に対し、割り当てられる枠は {capacity} 名分しかありません",
+                required=total_work, available=capacity,
+            ))
+    else:
+        capacity = sum(min(s.work_limit, len(work_days)) for s in staffs if allowed[s.id])
+        if capacity < total_demand:
+            issues.append(FeasibilityIssue(
+                "monthly_capacity",
+                f"必要人数の月合計 {total_demand} 名に対し、全スタッフの勤務上限の合計は {capacity} 日です",
+                required=total_demand, available=capacity,
+            ))
+
+    return issues
@@ -0,0 +1,116 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from ortools.sat.python import cp_model
+
+from backend.core.logging import get_logger
+from .constraints import ShiftConstraints
+from .eligibility import build_eligibility
+from .inputs import MonthInput
+from .engine import month_days, add_solution_hints, read_assignment_matrix
+from .exporter import REST, create_excel_file, extract_shift_data
+
+logger = get_logger(__name__)
+
+# 近傍の広げ方（変更日から前後何日を再最適化するか）。None は月全体
+REPAIR_RADII = (0, 1, 3, 7, None)
+
+# 希望休違反1件は、割り当て変更何件分に相当するか
+ABSENCE_PENALTY_WEIGHT = 100
+
+
+@dataclass
+class RepairResult:
+    """局所修復の結果"""
+    excel_path: Optional[str]
+    shift_data: dict
+    radius: Optional[int]
+    changed_cells: List[dict] = field(default_factory=list)
+    matrix: Optional[List[List[int]]] = None  # スタッフ × 日 の業務インデックス（休みは REST）
+
+
+def _free_days(days, changed_days, radius):
+    if radius is None:
+        return set(days)
+    return {d for d in days if any(abs(d - c) <= radius for c in changed_days)}
+
+
+def repair_schedule(staffs, tasks, requirements, absences, year, month, base_assignments, changed_days,
+                    forced_rest=None, holidays=None, additional_days=None, time_limit_seconds=1.0,
+                    write_excel=True):
+    """既存シフトを、変更のあった日の近傍だけ再最適化して修復する
+
+    base_assignments: 現在のシフト (staff_id, day) -> task_id
+    changed_days: 変更のあった日（休暇承認日・要件変更日など）
+    forced_rest: 必ず休みにする (staff_id, day) の一覧（承認した休暇申請など）
+
+    近傍外の割り当ては定数として固定し、近傍内だけ変数にして求解する。
+    解なしなら REPAIR_RADII の順に近傍を広げ、月全体でも解なしなら None を返す。
+    write_excel=False なら Excel を出力しない（承認前の可否チェック用）。
+    """
+    days = month_days(year, month)
+    month_input = MonthInput.from_rows(requirements, absences, holidays, year, month)
+    eligible = build_eligibility(staffs, tasks, days, month_input.holiday_days)
+    forced_rest = set(forced_rest or [])
+    changed_days = set(changed_days) | {d for _, d in forced_rest}
+
+    for radius in REPAIR_RADII:
+        free_days = _free_days(days, changed_days, radius)
+        model = cp_model.CpModel()
+
+        shifts = {}
+        free_vars = {}
+        for s_id, d, t_id in eligible:
+            if d in free_days:
+                var = model.NewBoolVar(f"shift_s{s_id}_d{d}_t{t_id}")
+                shifts[(s_id, d, t_id)] = var
+                free_vars[(s_id, d, t_id)] = var
+            elif base_assignments.get((s_id, d)) == t_id:
+                shifts[(s_id, d, t_id)] = model.NewConstant(1)
+
+        for s_id, d, t_id in free_vars:
+            if (s_id, d) in forced_rest:
+                model.Add(free_vars[(s_id, d, t_id)] == 0)
+
+        constraints = ShiftConstraints(model, shifts, staffs, tasks, days, year, month)
+        constraints.add_hard_constraints(month_input, additional_days)
+        penalties = constraints.add_soft_constraints(month_input)
+
+        # 既存シフトからの変更数を最小化（希望休違反はそれより重く扱う）
+        churn = [
+            (1 - var) if base_assignments.get((s_id, d)) == t_id else var
+            for (s_id, d, t_id), var in free_vars.items()
+        ]
+        model.Minimize(ABSENCE_PENALTY_WEIGHT * sum(penalties) + sum(churn))
+        add_solution_hints(model, free_vars, base_assignments)
+
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = time_limit_seconds
+        status = solver.Solve(model)
+        logger.info(
+            "局所修復: 半径=%s, 変数=%d, %s (%.3f秒)",
+            "月全体" if radius is None else radius, len(free_vars), solver.StatusName(status), solver.WallTime(),
+        )
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            continue
+
+        matrix = read_assignment_matrix(solver, shifts, staffs, tasks, days)
+        changed_cells = []
+        for s, row in zip(staffs, matrix):
+            for d in sorted(free_days):
+                t_idx = row[d - 1]
+                after = tasks[t_idx].id if t_idx != REST else None
+                before = base_assignments.get((s.id, d))
+                if after != before:
+                    changed_cells.append({
+                        "staff_id": s.id,
+                        "date": f"{year}-{month:02d}-{d:02d}",
+                        "before_task_id": before,
+                        "after_task_id": after,
+                    })
+
+        excel_path = create_excel_file(matrix, staffs, tasks, days, year, month) if write_excel else None
+        shift_data = extract_shift_data(matrix, staffs, tasks, days, year, month)
+        return RepairResult(excel_path, shift_data, radius, changed_cells, matrix)
+
+    return None
@@ -0,0 +1,31 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.core.database import Base
+
+
+@pytest.fixture
+def engine():
+    """テストごとの空のインメモリ SQLite（テーブルは作らない）"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    """全テーブルを作成したインメモリ SQLite のセッション"""
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def statements(engine):
+    """engine で発行した SQL の記録先（数える直前に clear() して使う）"""
+    recorded = []
+    event.listen(engine, "before_cursor_execute", lambda *args: recorded.append(args[2]))
+    return recorded
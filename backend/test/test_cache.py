@@ -0,0 +1,66 @@
+import os
+
+from backend.solver.cache import ScheduleCache, CachedSchedule, compute_input_hash
+from backend.solver.exporter import REST, ShiftSheet
+from backend.models.models import Staff, Task, DailyRequirement
+
+
+def _inputs():
+    staffs = [
+        Staff(id=2, name="B", is_nurse=True, work_limit=20, license_type=0, is_part_time=False, can_only_train=False),
+        Staff(id=1, name="A", is_nurse=False, work_limit=20, license_type=1, is_part_time=False, can_only_train=False),
+    ]
+    tasks = [Task(id=1, name="風呂")]
+    reqs = [
+        DailyRequirement(date="2025-11-01", task_id=1, count=1),
+        DailyRequirement(date="2025-10-01", task_id=1, count=3),
+    ]
+    return staffs, tasks, reqs
+
+
+def test_input_hash_is_canonical():
+    """並び順や対象月以外のデータに依存せず、対象月の内容が変われば変化するか"""
+    staffs, tasks, reqs = _inputs()
+    base = compute_input_hash(staffs, tasks, reqs, [], [], 2025, 11)
+
+    assert compute_input_hash(list(reversed(staffs)), tasks, reqs[:1], [], [], 2025, 11) == base
+    reqs[0].count = 2
+    assert compute_input_hash(staffs, tasks, reqs, [], [], 2025, 11) != base
+    assert compute_input_hash(staffs, tasks, reqs, [], [], 2025, 11, additional_days=1) != \
+        compute_input_hash(staffs, tasks, reqs, [], [], 2025, 11)
+
+
+def _sheet():
+    staffs, tasks, _ = _inputs()
+    return ShiftSheet([[0, REST], [REST, 0]], staffs, tasks, [1, 2], 2025, 11)
+
+
+def test_cache_evicts_by_size_and_age():
+    """件数上限と有効期限で破棄されるか"""
+    cache = ScheduleCache(max_entries=2, ttl_seconds=60)
+    for key in ("a", "b", "c"):
+        cache.put(key, CachedSchedule(2025, 11, {}, _sheet()))
+
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+
+    cache.put("old", CachedSchedule(2025, 11, {}, _sheet(), created_at=0))
+    assert cache.get("old") is None
+
+
+def test_excel_is_built_on_first_request(tmp_path, monkeypatch):
+    """Excel は初回要求時に1度だけ作成され、削除されていれば作り直されるか"""
+    monkeypatch.chdir(tmp_path)
+    cache = ScheduleCache(max_entries=2, ttl_seconds=60)
+    cache.put("abc", CachedSchedule(2025, 11, {}, _sheet()))
+    assert cache.get("abc").excel_path is None
+
+    path = cache.excel_path("abc")
+    assert path == "static/shift_2025_11_abc.xlsx"
+    assert os.path.exists(path)
+    mtime = os.path.getmtime(path)
+    assert cache.excel_path("abc") == path and os.path.getmtime(path) == mtime
+
+    os.remove(path)
+    assert cache.excel_path("abc") == path and os.path.exists(path)
+    assert cache.excel_path("missing") is None
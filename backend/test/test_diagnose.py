@@ -0,0 +1,42 @@
+from backend.solver.engine import diagnose_infeasibility, solve_shifts
+from backend.models.models import Staff, Task, DailyRequirement
+
+
+def _infeasible_input():
+    staffs = [
+        Staff(id=i, name=f"S{i}", is_nurse=(i == 1), work_limit=20, license_type=0, is_part_time=False, can_only_train=False)
+        for i in range(1, 4)
+    ]
+    tasks = [Task(id=1, name="看護"), Task(id=2, name="風呂")]
+    reqs = [
+        DailyRequirement(date="2025-11-04", task_id=1, count=1),
+        DailyRequirement(date="2025-11-04", task_id=2, count=3),  # 3名で計4枠は埋まらない
+        DailyRequirement(date="2025-11-05", task_id=2, count=1),
+    ]
+    return staffs, tasks, reqs
+
+
+def test_infeasible_month_reports_minimal_conflicts():
+    """解なしの場合、原因となった日・制約だけが返るか"""
+    staffs, tasks, reqs = _infeasible_input()
+
+    result = solve_shifts(staffs, tasks, reqs, [], 2025, 11, diagnose=True)
+
+    assert not result.feasible
+    c2 = [c for c in result.conflicts if c["constraint"] == "C2"]
+    assert [c["date"] for c in c2] == ["2025-11-04"]
+
+
+def test_diagnosis_stops_minimizing_when_cancelled():
+    """打ち切り要求があれば極小化せず、最初に得た原因の集合をそのまま返すか"""
+    staffs, tasks, reqs = _infeasible_input()
+    checks = []
+
+    def should_stop():
+        checks.append(True)
+        return True
+
+    conflicts = diagnose_infeasibility(staffs, tasks, reqs, [], 2025, 11, should_stop=should_stop)
+
+    assert len(checks) == 1
+    assert any(c["constraint"] == "C2" and c.get("date") == "2025-11-04" for c in conflicts)
@@ -0,0 +1,27 @@
+from backend.solver.engine import solve_shifts
+from backend.models.models import Staff, Task, DailyRequirement
+
+
+def test_elastic_mode_returns_schedule_with_shortfalls():
+    """弾性モードでは解なしの月でも下書きと不足の一覧が返るか"""
+    staffs = [
+        Staff(id=i, name=f"S{i}", is_nurse=(i == 1), work_limit=20, license_type=0, is_part_time=False, can_only_train=False)
+        for i in range(1, 4)
+    ]
+    tasks = [Task(id=1, name="看護"), Task(id=2, name="風呂")]
+    reqs = [
+        DailyRequirement(date="2025-11-04", task_id=1, count=1),
+        DailyRequirement(date="2025-11-04", task_id=2, count=3),  # 3名で計4枠は埋まらない
+        DailyRequirement(date="2025-11-05", task_id=2, count=1),
+    ]
+
+    strict = solve_shifts(staffs, tasks, reqs, [], 2025, 11)
+    assert not strict.feasible
+
+    result = solve_shifts(staffs, tasks, reqs, [], 2025, 11, elastic=True)
+
+    assert result.feasible
+    # 4枠に対して3名なので、11/4 の不足は合計1名だけ
+    assert [(f["type"], f["date"]) for f in result.shortfalls] == [("requirement", "2025-11-04")]
+    assert sum(f["shortage"] for f in result.shortfalls) == 1
+    assert len(result.shift_data["by_date"]["2025-11-04"]) == 3
@@ -0,0 +1,33 @@
+from backend.solver.eligibility import build_eligibility, is_task_allowed
+from backend.models.models import Staff, Task
+
+
+def test_task_eligibility_rules():
+    """スタッフ属性に応じて担当不可の業務が除外されるか"""
+    nurse = Staff(id=1, name="看護師", is_nurse=True, license_type=0, is_part_time=False, can_only_train=False)
+    part_driver = Staff(id=2, name="パート", is_nurse=False, license_type=2, is_part_time=True, can_only_train=False)
+    trainer = Staff(id=3, name="訓練限定", is_nurse=False, license_type=1, is_part_time=False, can_only_train=True)
+
+    nursing = Task(id=1, name="看護")
+    training = Task(id=2, name="訓練")
+    leader = Task(id=3, name="リーダー")
+    wagon = Task(id=4, name="ワゴン運転")
+
+    assert is_task_allowed(nurse, nursing)
+    assert not is_task_allowed(part_driver, nursing)        # C4
+    assert not is_task_allowed(trainer, leader)             # C5 / C8
+    assert is_task_allowed(trainer, training)
+    assert not is_task_allowed(part_driver, leader)         # C8
+    assert not is_task_allowed(nurse, wagon)                # C9
+    assert not is_task_allowed(part_driver, wagon)          # C10
+    assert not is_task_allowed(part_driver, training)       # C11
+
+
+def test_build_eligibility_skips_holidays():
+    """施設休日（C7）には変数が生成されないか"""
+    staffs = [Staff(id=1, name="A", is_nurse=False, license_type=0, is_part_time=False, can_only_train=False)]
+    tasks = [Task(id=1, name="風呂"), Task(id=2, name="看護")]
+
+    eligible = build_eligibility(staffs, tasks, [1, 2, 3], holiday_days={2})
+
+    assert eligible == [(1, 1, 1), (1, 3, 1)]
@@ -0,0 +1,78 @@
+import io
+
+from openpyxl import load_workbook
+from ortools.sat.python import cp_model
+
+from backend.solver.engine import read_assignment_matrix
+from backend.solver.exporter import (
+    REST, ShiftSheet, extract_compact_shift_data, extract_shift_data, write_shift_workbook,
+)
+from backend.solver.hints import assignments_from_matrix, read_excel_assignments
+from backend.models.models import Staff, Task
+
+
+def test_assignment_matrix_drives_shift_data():
+    """解から読み出した行列（休みは REST）から by_date / by_staff が組み立てられるか"""
+    staffs = [
+        Staff(id=10, name="A", is_nurse=True),
+        Staff(id=20, name="B", is_nurse=False),
+    ]
+    tasks = [Task(id=1, name="看護"), Task(id=2, name="風呂")]
+    days = [1, 2]
+    model = cp_model.CpModel()
+    shifts = {
+        (10, 1, 1): model.NewBoolVar(""),
+        (10, 2, 2): model.NewBoolVar(""),
+        (20, 1, 2): model.NewBoolVar(""),
+    }
+    model.Add(shifts[(10, 1, 1)] == 1)
+    model.Add(shifts[(10, 2, 2)] == 0)
+    model.Add(shifts[(20, 1, 2)] == 1)
+    solver = cp_model.CpSolver()
+    solver.Solve(model)
+
+    matrix = read_assignment_matrix(solver, shifts, staffs, tasks, days)
+    data = extract_shift_data(matrix, staffs, tasks, days, 2025, 11)
+
+    assert matrix == [[0, REST], [1, REST]]
+    assert [(i["staffId"], i["taskName"]) for i in data["by_date"]["2025-11-01"]] == [(10, "看護"), (20, "風呂")]
+    assert "2025-11-02" not in data["by_date"]
+    assert data["by_staff"][0]["shifts"] == {"2025-11-01": "看護", "2025-11-02": ""}
+
+
+def test_write_shift_workbook_streams_multiple_sheets():
+    """複数月のシートをファイルオブジェクトへ書き出し、読み戻せるか"""
+    staffs = [Staff(id=10, name="A", is_nurse=True), Staff(id=20, name="B", is_nurse=False)]
+    tasks = [Task(id=1, name="看護"), Task(id=2, name="風呂")]
+    buffer = io.BytesIO()
+
+    write_shift_workbook(buffer, [
+        ShiftSheet([[0, REST], [1, 1]], staffs, tasks, [1, 2], 2025, 11),
+        ShiftSheet([[REST, 0], [REST, REST]], staffs, tasks, [1, 2], 2025, 12),
+    ])
+
+    buffer.seek(0)
+    wb = load_workbook(buffer)
+    assert wb.sheetnames == ["11月シフト", "12月シフト"]
+    ws = wb["11月シフト"]
+    assert [c.value for c in ws[1]] == ["氏名 \\ 日付", "1日\n(土)", "2日\n(日)"]
+    assert [c.value for c in ws[2]] == ["A", "看護", "休"]
+    assert ws["C2"].style == "shift_rest"
+
+    buffer.seek(0)
+    assert read_excel_assignments(buffer, staffs, tasks) == {(10, 1): 1, (20, 1): 2, (20, 2): 2}
+
+
+def test_compact_shift_data_round_trips_assignments():
+    """コンパクト形式がスタッフ・業務を1回ずつ持ち、行列から割り当てを復元できるか"""
+    staffs = [Staff(id=10, name="A", is_nurse=True), Staff(id=20, name="B", is_nurse=False)]
+    tasks = [Task(id=1, name="看護"), Task(id=2, name="風呂")]
+    matrix = [[0, REST], [1, 1]]
+
+    data = extract_compact_shift_data(matrix, staffs, tasks, [1, 2], 2025, 11)
+
+    assert data["format"] == "compact"
+    assert data["dates"] == ["2025-11-01", "2025-11-02"]
+    assert data["staffs"] == [{"id": 10, "name": "A", "isNurse": True}, {"id": 20, "name": "B", "isNurse": False}]
+    assert data["tasks"] == [{"id": 1, "name": "看護"}, {"id": 2, "name": "風呂"}]
+    assert assignments_from_matrix(data["matrix"], staffs, tasks, [1, 2]) == {(10, 1): 1, (20, 1): 2, (20, 2): 2}
@@ -0,0 +1,39 @@
+import datetime
+from backend.solver.engine import month_days, solve_shifts
+from backend.solver.exporter import ShiftSheet, write_shift_workbook
+from backend.solver.hints import assignments_from_shift_data, read_excel_assignments, shift_to_month
+from backend.models.models import Staff, Task, DailyRequirement
+
+
+def test_warm_start_roundtrip_from_excel(tmp_path):
+    """出力したExcelから割り当てを復元し、ヒントとして再求解できるか"""
+    staffs = [
+        Staff(id=1, name="A", is_nurse=False, work_limit=20, license_type=0, is_part_time=False, can_only_train=False),
+        Staff(id=2, name="B", is_nurse=True, work_limit=20, license_type=0, is_part_time=False, can_only_train=False),
+    ]
+    tasks = [Task(id=1, name="風呂"), Task(id=2, name="看護")]
+    reqs = [DailyRequirement(date=f"2025-11-{d:02d}", task_id=2, count=1) for d in range(1, 11)]
+
+    result = solve_shifts(staffs, tasks, reqs, [], 2025, 11, write_excel=False)
+    previous = assignments_from_shift_data(result.shift_data)
+    excel_path = tmp_path / "shift.xlsx"
+    write_shift_workbook(excel_path, [ShiftSheet(result.matrix, staffs, tasks, month_days(2025, 11), 2025, 11)])
+
+    assert read_excel_assignments(excel_path, staffs, tasks) == previous
+    assert all(previous[(2, d)] == 2 for d in range(1, 11))
+
+    result = solve_shifts(staffs, tasks, reqs, [], 2025, 11, hints=previous, write_excel=False)
+    assert result.feasible
+    assert assignments_from_shift_data(result.shift_data)[(2, 1)] == 2
+
+
+def test_shift_to_month_keeps_weekday():
+    """前月の割り当てが4週前（対象月内なら5週前）の同じ曜日から写されるか"""
+    previous = {(1, d): d for d in range(1, 32)}  # 2025年10月。値に元の日付を持たせる
+    shifted = shift_to_month(previous, 2025, 10, 2025, 11)
+
+    assert len(shifted) == 30
+    for d in range(1, 31):
+        src = d + 3 if d <= 28 else d - 4  # 11/29, 11/30 は4週前が11月内なので5週前
+        assert shifted[(1, d)] == src
+        assert datetime.date(2025, 10, src).weekday() == datetime.date(2025, 11, d).weekday()
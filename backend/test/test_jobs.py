@@ -0,0 +1,40 @@
+import threading
+from backend.schemas.enums import JobStatus
+from backend.solver.jobs import JobManager, JobError
+
+
+def _wait(job, timeout=5):
+    job.future.result(timeout=timeout)
+
+
+def test_job_succeeds_and_stays_queryable():
+    """完了したジョブの結果が後から取得できるか"""
+    manager = JobManager(max_workers=1, max_retained=10)
+    job = manager.submit(2025, 11, lambda job: {"download_url": "/static/x.xlsx"})
+    _wait(job)
+
+    stored = manager.get(job.id)
+    assert stored.status == JobStatus.SUCCEEDED
+    assert stored.to_dict()["download_url"] == "/static/x.xlsx"
+    manager.shutdown()
+
+
+def test_job_failure_and_cancel():
+    """解なしは failed、キャンセルされた待機中ジョブは cancelled になるか"""
+    manager = JobManager(max_workers=1, max_retained=10)
+    release = threading.Event()
+
+    def blocking(job):
+        release.wait(5)
+        raise JobError("解なし")
+
+    running = manager.submit(2025, 11, blocking)
+    queued = manager.submit(2025, 12, lambda job: {})
+    manager.cancel(queued.id)
+    release.set()
+    _wait(running)
+
+    assert running.status == JobStatus.FAILED
+    assert running.error == "解なし"
+    assert queued.status == JobStatus.CANCELLED
+    manager.shutdown()
@@ -0,0 +1,87 @@
+import datetime
+
+import pytest
+from sqlalchemy import Date, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.core.migrations import run_migrations
+from backend.crud import crud_shift
+from backend.models.models import DailyRequirement, Holiday, MonthlyRestDaySetting, RequestedDayOff
+
+
+def test_string_date_columns_are_converted_to_date(engine):
+    """文字列の日付列を持つ既存DBが DATE 型に作り直され、不正・重複行は *_rejected テーブルに分けて移行されるか"""
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE daily_requirements (id INTEGER PRIMARY KEY, date VARCHAR, task_id INTEGER, count INTEGER)"))
+        conn.execute(text("CREATE INDEX ix_daily_requirements_date ON daily_requirements (date)"))
+        conn.execute(text("CREATE TABLE holidays (id INTEGER PRIMARY KEY, date VARCHAR UNIQUE, description VARCHAR)"))
+        conn.execute(text(
+            "INSERT INTO daily_requirements (id, date, task_id, count) VALUES "
+            "(1, '2025-11-01', 1, 2), (2, '2025-11-01', 1, 3), (3, 'invalid', 1, 1), (4, '2025-11-02', 1, 4)"
+        ))
+        conn.execute(text("INSERT INTO holidays (id, date, description) VALUES (1, '2025-11-23', '勤労感謝の日')"))
+
+    run_migrations(engine)
+    run_migrations(engine)  # 2回目は何もしない
+
+    inspector = inspect(engine)
+    for table in ("daily_requirements", "holidays", "absence_requests"):
+        date_type = next(c["type"] for c in inspector.get_columns(table) if c["name"] == "date")
+        assert isinstance(date_type, Date)
+    assert "uq_daily_requirements_date_task" in {ix["name"] for ix in inspector.get_indexes("daily_requirements")}
+
+    db = sessionmaker(bind=engine)()
+    rows = db.query(DailyRequirement).order_by(DailyRequirement.date).all()
+    assert [(r.id, r.date, r.count) for r in rows] == [
+        (2, datetime.date(2025, 11, 1), 3),
+        (4, datetime.date(2025, 11, 2), 4),
+    ]
+    assert db.query(Holiday).one().date == datetime.date(2025, 11, 23)
+    # 移さなかった行は元の値のまま残る
+    with engine.connect() as conn:
+        rejected = conn.execute(text("SELECT id, date, count FROM daily_requirements_rejected ORDER BY id")).all()
+    assert [tuple(r) for r in rejected] == [(1, "2025-11-01", 2), (3, "invalid", 1)]
+    assert not inspect(engine).has_table("holidays_rejected")
+
+
+def test_duplicate_keys_stop_startup_without_deleting_rows(engine):
+    """一意インデックスのない既存DBに重複行があれば、削除せずに重複 ID を示して止まり、整理後は upsert が使えるか"""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE monthly_rest_day_settings "
+            "(id INTEGER PRIMARY KEY, year INTEGER NOT NULL, month INTEGER NOT NULL, additional_days INTEGER NOT NULL)"
+        ))
+        conn.execute(text(
+            "INSERT INTO monthly_rest_day_settings (id, year, month, additional_days) VALUES "
+            "(1, 2025, 11, 8), (2, 2025, 11, 9), (3, 2025, 12, 10)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE requested_days_off (id INTEGER PRIMARY KEY, staff_id INTEGER NOT NULL, "
+            "request_date DATE NOT NULL, reason VARCHAR(500), status VARCHAR(20), rejection_reason VARCHAR(500), "
+            "created_at DATETIME, updated_at DATETIME, approved_at DATETIME, approved_by VARCHAR(100))"
+        ))
+        conn.execute(text(
+            "INSERT INTO requested_days_off (id, staff_id, request_date, status) VALUES "
+            "(1, 1, '2025-11-05', 'approved'), (2, 1, '2025-11-05', 'rejected'), (3, 2, '2025-11-05', 'pending')"
+        ))
+
+    with pytest.raises(RuntimeError) as exc:
+        run_migrations(engine)
+    assert "id=[1, 2]" in str(exc.value)
+    db = sessionmaker(bind=engine)()
+    assert db.query(MonthlyRestDaySetting).count() == 3
+    assert [(r.id, r.status) for r in db.query(RequestedDayOff).order_by(RequestedDayOff.id)] == [
+        (1, "approved"), (2, "rejected"), (3, "pending"),
+    ]
+
+    # 管理者が重複を整理すれば起動でき、upsert も使える
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM monthly_rest_day_settings WHERE id = 1"))
+        conn.execute(text("DELETE FROM requested_days_off WHERE id = 2"))
+    run_migrations(engine)
+
+    inspector = inspect(engine)
+    assert "uq_monthly_rest_day_settings_year_month" in {ix["name"] for ix in inspector.get_indexes("monthly_rest_day_settings")}
+    setting = crud_shift.upsert_monthly_rest_setting(db, 2025, 11, 7)
+    assert (setting.id, setting.additional_days) == (2, 7)
+    assert db.query(MonthlyRestDaySetting).count() == 2
@@ -0,0 +1,42 @@
+import datetime
+
+from backend.crud import crud_shift
+from backend.models.models import Staff, Task, DailyRequirement, Holiday, RequestedDayOff, AbsenceRequest
+from backend.solver.inputs import MonthInput
+
+
+def test_month_input_keeps_only_target_month():
+    """対象月の行だけが日番号に変換され、他の月や不正な日付は無視されるか（date と文字列の両方）"""
+    month_input = MonthInput.from_rows(
+        [
+            DailyRequirement(date=datetime.date(2025, 11, 3), task_id=1, count=2),
+            DailyRequirement(date="2025-10-03", task_id=1, count=5),
+            DailyRequirement(date="invalid", task_id=1, count=9),
+        ],
+        [AbsenceRequest(staff_id=7, date="2025-11-10"), AbsenceRequest(staff_id=8, date="2025-12-10")],
+        [Holiday(date="2025-11-23"), Holiday(date="2026-11-23")],
+        2025, 11,
+    )
+
+    assert month_input.requirements == {(3, 1): 2}
+    assert month_input.holiday_days == {23}
+    assert month_input.absences == [(7, 10)]
+    assert month_input.absent_staff_ids == {7}
+
+
+def test_month_shift_data_loads_only_target_month(db):
+    """ソルバー入力の読み込みが対象月の要件・休日・承認済み希望休だけを返すか"""
+    db.add_all([Staff(id=1, name="S1"), Task(id=1, name="風呂")])
+    for month in (10, 11, 12):
+        db.add(DailyRequirement(date=datetime.date(2025, month, 1), task_id=1, count=month))
+        db.add(Holiday(date=datetime.date(2025, month, 15)))
+        db.add(RequestedDayOff(staff_id=1, request_date=datetime.date(2025, month, 20), status="approved"))
+    db.add(RequestedDayOff(staff_id=1, request_date=datetime.date(2025, 11, 21), status="pending"))
+    db.commit()
+
+    staffs, tasks, absences, requirements, holidays = crud_shift.get_month_shift_data(db, 2025, 11)
+
+    assert [(r.date, r.count) for r in requirements] == [(datetime.date(2025, 11, 1), 11)]
+    assert [h.date for h in holidays] == [datetime.date(2025, 11, 15)]
+    assert [(a.staff_id, a.date) for a in absences] == [(1, datetime.date(2025, 11, 20))]
+    assert len(staffs) == 1 and len(tasks) == 1
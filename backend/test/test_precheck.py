@@ -0,0 +1,35 @@
+from backend.solver.engine import month_days
+from backend.solver.precheck import check_feasibility
+from backend.models.models import Staff, Task, DailyRequirement
+
+
+def _staff(i, **kwargs):
+    attrs = dict(is_nurse=False, work_limit=20, license_type=0, is_part_time=False, can_only_train=False)
+    attrs.update(kwargs)
+    return Staff(id=i, name=f"S{i}", **attrs)
+
+
+def test_precheck_reports_short_day_and_task():
+    """担当可能人数の不足と、業務の取り合いによる不足を日・業務単位で報告するか"""
+    staffs = [_staff(1, is_nurse=True), _staff(2)]
+    tasks = [Task(id=1, name="看護"), Task(id=2, name="風呂")]
+    reqs = [
+        DailyRequirement(date="2025-11-04", task_id=1, count=2),   # 看護師は1名のみ
+        DailyRequirement(date="2025-11-05", task_id=1, count=1),
+        DailyRequirement(date="2025-11-05", task_id=2, count=2),   # 合計3枠に2名
+    ]
+
+    issues = check_feasibility(staffs, tasks, reqs, 2025, 11, month_days(2025, 11))
+
+    kinds = {(i.kind, i.date, i.task_id) for i in issues}
+    assert ("task_short", "2025-11-04", 1) in kinds
+    assert any(kind == "day_short" and date == "2025-11-05" for kind, date, _ in kinds)
+
+
+def test_precheck_passes_feasible_month():
+    """解がある入力では何も報告しないか"""
+    staffs = [_staff(1, is_nurse=True), _staff(2)]
+    tasks = [Task(id=1, name="看護"), Task(id=2, name="風呂")]
+    reqs = [DailyRequirement(date="2025-11-04", task_id=1, count=1)]
+
+    assert check_feasibility(staffs, tasks, reqs, 2025, 11, month_days(2025, 11)) == []
@@ -0,0 +1,30 @@
+from backend.solver.engine import solve_shifts
+from backend.solver.hints import assignments_from_shift_data
+from backend.solver.repair import repair_schedule
+from backend.models.models import Staff, Task, DailyRequirement
+
+
+def test_repair_frees_only_neighbourhood():
+    """休暇承認後の修復で、対象スタッフが休みになり変更が近傍に限られるか"""
+    staffs = [
+        Staff(id=i, name=f"S{i}", is_nurse=False, work_limit=20, license_type=0, is_part_time=False, can_only_train=False)
+        for i in range(1, 6)
+    ]
+    tasks = [Task(id=1, name="風呂")]
+    reqs = [DailyRequirement(date=f"2025-11-{d:02d}", task_id=1, count=3) for d in range(1, 31)]
+
+    generated = solve_shifts(staffs, tasks, reqs, [], 2025, 11, additional_days=7, write_excel=False)
+    base = assignments_from_shift_data(generated.shift_data)
+    staff_id, day = next(key for key in sorted(base))
+
+    result = repair_schedule(
+        staffs, tasks, reqs, [], 2025, 11, base, changed_days=[],
+        forced_rest=[(staff_id, day)], additional_days=7, write_excel=False,
+    )
+
+    assert result is not None
+    repaired = assignments_from_shift_data(result.shift_data)
+    assert (staff_id, day) not in repaired
+    assert result.radius is not None
+    assert all(abs(int(c["date"][-2:]) - day) <= result.radius for c in result.changed_cells)
+    assert len(repaired) == len(base)
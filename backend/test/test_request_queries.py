@@ -0,0 +1,143 @@
+import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from backend.crud import crud_request
+from backend.models.models import Staff, RequestedDayOff
+from backend.schemas import schemas
+from backend.api.endpoints.requests import (
+    bulk_update_day_off_status, create_bulk_day_off_requests, get_admin_day_off_calendar, get_all_day_off_requests, get_all_staff_day_off_calendar, get_day_off_statistics,
+)
+
+
+def _add_requests(db, staff_ids):
+    """staff_ids の各スタッフを登録し、それぞれ11月に2日ずつ申請させる"""
+    for i in staff_ids:
+        db.add(Staff(id=i, name=f"S{i}"))
+        for day, status in ((i % 28 + 1, "approved"), ((i + 7) % 28 + 1, "pending")):
+            db.add(RequestedDayOff(staff_id=i, request_date=datetime.date(2025, 11, day), status=status))
+    db.commit()
+    db.expunge_all()
+
+
+def _query_counts(db, statements):
+    calls = [
+        lambda: get_all_staff_day_off_calendar(year=2025, month=11, db=db, _=None),
+        lambda: get_admin_day_off_calendar(year=2025, month=11, include_pending=True, db=db, _=None),
+        lambda: get_day_off_statistics(year=2025, month=11, db=db, _=None),
+        lambda: get_all_day_off_requests(status=None, staff_id=None, year=2025, month=11, db=db, _=None),
+    ]
+    counts = []
+    for call in calls:
+        statements.clear()
+        db.expunge_all()
+        results = call()
+        assert results and all(
+            getattr(r, "staff_name", None) != "Unknown" and getattr(r, "staff_names", ["x"]) for r in results
+        )
+        counts.append(len(statements))
+    return counts
+
+
+def test_calendar_and_statistics_query_count_is_constant(db, statements):
+    """申請件数が増えてもスタッフ名の取得で発行する SQL の数が増えないか"""
+    _add_requests(db, range(1, 4))
+    small = _query_counts(db, statements)
+    _add_requests(db, range(4, 31))
+    large = _query_counts(db, statements)
+
+    assert small == large
+    assert all(count == 1 for count in large)
+
+
+def test_day_off_statistics_aggregates_per_date(db):
+    """日付ごとの件数・承認数・申請中数・職員名が SQL 集計で正しく返るか（却下は含めない）"""
+    db.add_all([Staff(id=1, name="佐藤"), Staff(id=2, name="鈴木"), Staff(id=3, name="高橋")])
+    nov3 = datetime.date(2025, 11, 3)
+    db.add_all([
+        RequestedDayOff(staff_id=1, request_date=nov3, status="approved"),
+        RequestedDayOff(staff_id=2, request_date=nov3, status="pending"),
+        RequestedDayOff(staff_id=3, request_date=nov3, status="rejected"),
+        RequestedDayOff(staff_id=3, request_date=datetime.date(2025, 11, 10), status="pending"),
+        RequestedDayOff(staff_id=1, request_date=datetime.date(2025, 12, 1), status="approved"),
+    ])
+    db.commit()
+
+    stats = get_day_off_statistics(year=2025, month=11, db=db, _=None)
+
+    assert [s.date for s in stats] == [nov3, datetime.date(2025, 11, 10)]
+    assert (stats[0].total_requests, stats[0].approved_count, stats[0].pending_count) == (2, 1, 1)
+    assert stats[0].staff_names == sorted(["佐藤", "鈴木"])
+    assert (stats[1].total_requests, stats[1].pending_count, stats[1].staff_names) == (1, 1, ["高橋"])
+
+
+def test_bulk_day_off_submission_is_set_based(db, statements):
+    """期間申請が既存・過去・重複日を除いて一括登録され、日数によらず一定回数の SQL で済むか"""
+    _add_requests(db, [1])
+    today = datetime.date.today()
+    days = [today + datetime.timedelta(days=i) for i in range(1, 15)]
+    db.add(RequestedDayOff(staff_id=1, request_date=days[2], status="pending"))
+    db.commit()
+    user = SimpleNamespace(id=1)
+
+    statements.clear()
+    body = schemas.RequestedDayOffBulkCreate(
+        staff_id=1, request_dates=days + [days[0], today - datetime.timedelta(days=1)], reason="旅行",
+    )
+    results = create_bulk_day_off_requests(body, db=db, current_user=user)
+
+    assert [r.request_date for r in results] == [d for d in days if d != days[2]]
+    assert all(r.id and r.status == "pending" and r.staff_name == "S1" for r in results)
+    # スタッフ取得・既存日付取得・一括 INSERT の3回
+    assert len([s for s in statements if not s.startswith(("BEGIN", "COMMIT"))]) == 3
+
+
+def test_duplicate_day_off_request_is_rejected_by_unique_constraint(db, monkeypatch):
+    """既存チェックをすり抜けた重複日付が一意制約で 409 になるか"""
+    _add_requests(db, [1])
+    day = datetime.date.today() + datetime.timedelta(days=3)
+    db.add(RequestedDayOff(staff_id=1, request_date=day, status="pending"))
+    db.commit()
+
+    monkeypatch.setattr(crud_request, "get_existing_request_dates", lambda *args: set())
+    with pytest.raises(HTTPException) as exc:
+        create_bulk_day_off_requests(
+            schemas.RequestedDayOffBulkCreate(staff_id=1, request_dates=[day]), db=db, current_user=SimpleNamespace(id=1),
+        )
+    assert exc.value.status_code == 409
+
+
+def test_bulk_status_update_reports_skipped_ids_in_constant_queries(db, statements):
+    """一括承認が承認待ちだけを変更し、対象外・存在しないIDを理由付きで返すか（SQL は件数によらず一定）"""
+    _add_requests(db, range(1, 21))
+    pending = [r.id for r in db.query(RequestedDayOff).filter(RequestedDayOff.status == "pending")]
+    approved = [r.id for r in db.query(RequestedDayOff).filter(RequestedDayOff.status == "approved")]
+
+    statements.clear()
+    result = bulk_update_day_off_status(
+        schemas.RequestedDayOffBulkStatusUpdate(request_ids=pending + approved[:2] + [9999], status="approved"),
+        db=db, _=None,
+    )
+
+    assert result.updated_ids == pending
+    assert [(s.id, s.reason, s.current_status) for s in result.skipped] == [
+        (approved[0], "invalid_transition", "approved"),
+        (approved[1], "invalid_transition", "approved"),
+        (9999, "not_found", None),
+    ]
+    assert len([s for s in statements if not s.startswith(("BEGIN", "COMMIT"))]) == 2
+    assert db.query(RequestedDayOff).filter(RequestedDayOff.status == "pending").count() == 0
+
+    result = bulk_update_day_off_status(
+        schemas.RequestedDayOffBulkStatusUpdate(request_ids=approved[:3], status="pending"), db=db, _=None,
+    )
+    assert result.updated_ids == approved[:3] and result.skipped == []
+    assert all(r.approved_by is None for r in db.query(RequestedDayOff).filter(RequestedDayOff.id.in_(approved[:3])))
+
+    with pytest.raises(HTTPException) as exc:
+        bulk_update_day_off_status(
+            schemas.RequestedDayOffBulkStatusUpdate(request_ids=pending, status="rejected"), db=db, _=None,
+        )
+    assert exc.value.status_code == 400
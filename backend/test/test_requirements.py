@@ -0,0 +1,95 @@
+import datetime
+
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from backend.models.models import Task, DailyRequirement
+from backend.schemas import schemas
+from backend.api.endpoints.shifts import upsert_month_requirements
+
+
+@pytest.fixture
+def db(db):
+    """業務2件を登録した DB"""
+    db.add_all([Task(id=1, name="風呂"), Task(id=2, name="食事")])
+    db.commit()
+    return db
+
+
+def test_month_matrix_is_upserted_in_one_statement(db, statements):
+    """行列指定で1か月分が1回の INSERT ... ON CONFLICT で登録され、既存の行は人数だけ更新されるか"""
+    db.add(DailyRequirement(date=datetime.date(2025, 11, 1), task_id=1, count=9))
+    db.commit()
+
+    statements.clear()
+    result = upsert_month_requirements(
+        schemas.DailyRequirementMonthUpsert(year=2025, month=11, matrix={1: [2] * 30, 2: list(range(30))}), db=db,
+    )
+
+    assert result.upserted == 60
+    assert len([s for s in statements if s.startswith("INSERT")]) == 1
+    rows = {(r.date.day, r.task_id): r.count for r in db.query(DailyRequirement)}
+    assert len(rows) == 60
+    assert rows[(1, 1)] == 2 and rows[(30, 2)] == 29
+
+
+def test_weekday_pattern_is_expanded_over_the_month(db):
+    """曜日ごとの定型が対象月の各日に展開されるか（2025-11-01 は土曜）"""
+    upsert_month_requirements(
+        schemas.DailyRequirementMonthUpsert(year=2025, month=11, weekday_pattern={1: [1, 1, 1, 1, 1, 3, 0]}), db=db,
+    )
+
+    rows = {r.date.day: r.count for r in db.query(DailyRequirement)}
+    assert len(rows) == 30
+    assert (rows[1], rows[2], rows[3]) == (3, 0, 1)
+
+
+def test_month_upsert_rejects_invalid_input(db):
+    """指定方法・件数の誤りと存在しない業務を拒否するか"""
+    with pytest.raises(ValidationError):
+        schemas.DailyRequirementMonthUpsert(year=2025, month=11, matrix={1: [1] * 31})
+    with pytest.raises(ValidationError):
+        schemas.DailyRequirementMonthUpsert(year=2025, month=11)
+
+    with pytest.raises(HTTPException) as exc:
+        upsert_month_requirements(
+            schemas.DailyRequirementMonthUpsert(year=2025, month=11, weekday_pattern={99: [1] * 7}), db=db,
+        )
+    assert exc.value.status_code == 400
+
+
+def test_templates_are_expanded_with_date_overrides(db):
+    """定型が対象月に展開され、日付指定の日次要件が優先されるか（DB には展開結果を保存しない）"""
+    from backend.api.endpoints.shifts import read_effective_requirements, set_requirement_templates
+    from backend.crud import crud_shift
+
+    templates = set_requirement_templates(
+        schemas.RequirementTemplateUpsert(weekday_pattern={1: [2, 2, 2, 2, 2, 4, None], 2: [1] * 7}), db=db,
+    )
+    assert len(templates) == 13
+    db.add(DailyRequirement(date=datetime.date(2025, 11, 3), task_id=1, count=7))
+    db.add(DailyRequirement(date=datetime.date(2025, 10, 3), task_id=1, count=9))
+    db.commit()
+
+    _, _, _, requirements, _ = crud_shift.get_month_shift_data(db, 2025, 11)
+
+    counts = {(r.date.day, r.task_id): r.count for r in requirements}
+    assert counts[(1, 1)] == 4          # 土曜
+    assert (2, 1) not in counts         # 日曜は定型なし
+    assert counts[(3, 1)] == 7          # 日付指定で上書き
+    assert counts[(4, 1)] == 2 and counts[(2, 2)] == 1
+    assert len(counts) == 25 + 30        # 11月の日曜は5日
+    assert db.query(DailyRequirement).count() == 2
+
+    # 画面表示用の API も同じ展開結果を YYYY-MM-DD の日付で返す
+    effective = [schemas.EffectiveRequirement.model_validate(r) for r in read_effective_requirements(2025, 11, db=db)]
+    assert {(r.date, r.task_id): r.count for r in effective} == {
+        (f"2025-11-{d:02d}", t_id): count for (d, t_id), count in counts.items()
+    }
+
+    # None を指定した曜日は定型を削除する
+    templates = set_requirement_templates(
+        schemas.RequirementTemplateUpsert(weekday_pattern={2: [1, 1, 1, 1, 1, None, None]}), db=db,
+    )
+    assert sorted(t.weekday for t in templates if t.task_id == 2) == [0, 1, 2, 3, 4]
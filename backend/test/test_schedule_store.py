@@ -0,0 +1,94 @@
+import datetime
+import io
+
+import pytest
+from fastapi import HTTPException
+from openpyxl import load_workbook
+
+from backend.crud import crud_schedule
+from backend.models.models import Staff, Task
+from backend.api.endpoints.shifts import download_schedule_excel, read_latest_schedule_run
+from backend.solver.cache import schedule_cache
+
+
+@pytest.fixture
+def db(db):
+    """スタッフ2名・業務2件を登録した DB"""
+    db.add_all([
+        Staff(id=1, name="A", is_nurse=True),
+        Staff(id=2, name="B", is_nurse=False),
+        Task(id=1, name="看護"),
+        Task(id=2, name="風呂"),
+    ])
+    db.commit()
+    return db
+
+
+def test_schedule_runs_are_versioned_per_month(db):
+    """同じ月の保存は version が増え、スタッフの月間シフトは最新版から引けるか"""
+    first = crud_schedule.create_schedule_run(db, 2025, 11, {(1, 1): 1, (2, 1): 2}, input_hash="h1")
+    second = crud_schedule.create_schedule_run(db, 2025, 11, {(1, 2): 1, (1, 3): 2}, source="repair")
+    other = crud_schedule.create_schedule_run(db, 2025, 12, {(1, 1): 2})
+
+    assert (first.version, second.version, other.version) == (1, 2, 1)
+    assert [r.id for r in crud_schedule.get_schedule_runs(db, 2025, 11)] == [second.id, first.id]
+    assert crud_schedule.get_schedule_run_by_input_hash(db, "h1").id == first.id
+    assert crud_schedule.get_latest_assignments(db, 2025, 11) == {(1, 2): 1, (1, 3): 2}
+
+    rows = crud_schedule.get_staff_month_assignments(db, 1, 2025, 11)
+    assert [tuple(r) for r in rows] == [(datetime.date(2025, 11, 2), 1, "看護"), (datetime.date(2025, 11, 3), 2, "風呂")]
+    assert crud_schedule.get_staff_month_assignments(db, 2, 2025, 11) == []
+
+
+def test_schedule_run_retries_when_version_is_taken(db, monkeypatch):
+    """version の採番と保存の間に別の保存が割り込んでも、採番し直して保存できるか"""
+    crud_schedule.create_schedule_run(db, 2025, 11, {(1, 1): 1})
+    next_version = crud_schedule._next_version
+    stale = iter([1])
+    monkeypatch.setattr(crud_schedule, "_next_version", lambda *args: next(stale, None) or next_version(*args))
+
+    run = crud_schedule.create_schedule_run(db, 2025, 11, {(1, 2): 2})
+
+    assert run.version == 2
+    assert crud_schedule.get_latest_assignments(db, 2025, 11) == {(1, 2): 2}
+
+
+def test_draft_runs_are_not_used_as_latest(db):
+    """要件を満たせなかった下書きは履歴に残るが、最新シフト・スタッフの月間シフトには使われないか"""
+    confirmed = crud_schedule.create_schedule_run(db, 2025, 11, {(1, 1): 1})
+    draft = crud_schedule.create_schedule_run(db, 2025, 11, {(1, 2): 2}, input_hash="h2", is_draft=True)
+
+    assert [r.id for r in crud_schedule.get_schedule_runs(db, 2025, 11)] == [draft.id, confirmed.id]
+    assert crud_schedule.get_latest_schedule_run(db, 2025, 11).id == confirmed.id
+    assert crud_schedule.get_latest_assignments(db, 2025, 11) == {(1, 1): 1}
+    assert [r.date.day for r in crud_schedule.get_staff_month_assignments(db, 1, 2025, 11)] == [1]
+
+
+def test_latest_schedule_run_rebuilds_shift_data(db):
+    """保存済みシフトから、求解せずに生成時と同じ形式の shift_data が組み立てられるか"""
+    crud_schedule.create_schedule_run(db, 2025, 11, {(1, 1): 1, (2, 1): 2})
+
+    detail = read_latest_schedule_run(2025, 11, db=db)
+
+    assert detail["version"] == 1
+    assert [(i["staffId"], i["taskName"]) for i in detail["shift_data"]["by_date"]["2025-11-01"]] == \
+        [(1, "看護"), (2, "風呂")]
+    assert detail["shift_data"]["by_staff"][1]["shifts"]["2025-11-02"] == ""
+
+
+def test_excel_download_falls_back_to_persisted_run(db):
+    """キャッシュにないシフトの Excel も、入力ハッシュや run-<id> から保存済みシフトで作り直せるか"""
+    schedule_cache.clear()
+    crud_schedule.create_schedule_run(db, 2025, 11, {(1, 1): 1, (2, 1): 2}, input_hash="h1")
+    repaired = crud_schedule.create_schedule_run(db, 2025, 11, {(1, 2): 2}, source="repair")
+
+    for schedule_id in ("h1", f"run-{repaired.id}"):
+        response = download_schedule_excel(schedule_id, db=db)
+        assert response.media_type.startswith("application/vnd.openxmlformats")
+        workbook = load_workbook(io.BytesIO(response.body))
+        assert workbook.sheetnames
+
+    for missing in ("unknown", "run-999", "run-x"):
+        with pytest.raises(HTTPException) as exc:
+            download_schedule_excel(missing, db=db)
+        assert exc.value.status_code == 404
@@ -0,0 +1,19 @@
+import os
+
+import pytest
+from fastapi import HTTPException
+
+from backend.api.endpoints.shifts import generate_shift
+from backend.schemas import schemas
+from backend.solver.engine import SolverParams
+
+
+def test_num_workers_above_cpu_count_is_rejected():
+    """CPU コア数を超える num_workers は黙って丸めず 400 で拒否するか"""
+    cpu_count = os.cpu_count() or 1
+    with pytest.raises(HTTPException) as exc:
+        generate_shift(schemas.GenerateRequest(year=2025, month=11, num_workers=cpu_count + 1), db=None)
+    assert exc.value.status_code == 400
+
+    assert SolverParams(num_workers=cpu_count).resolved().num_workers == cpu_count
+    assert SolverParams(num_workers=0).resolved().num_workers == cpu_count
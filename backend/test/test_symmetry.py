@@ -0,0 +1,47 @@
+from ortools.sat.python import cp_model
+
+from backend.solver.constraints import ShiftConstraints
+from backend.solver.engine import solve_shifts, month_days
+from backend.solver.inputs import MonthInput
+from backend.models.models import Staff, Task, DailyRequirement, AbsenceRequest
+
+
+def _staffs():
+    return [
+        Staff(id=i, name=f"S{i}", is_nurse=False, work_limit=20, license_type=0, is_part_time=False, can_only_train=False)
+        for i in range(1, 5)
+    ] + [Staff(id=5, name="N", is_nurse=True, work_limit=20, license_type=0, is_part_time=False, can_only_train=False)]
+
+
+def test_symmetry_classes_exclude_staff_with_absences():
+    """属性が同じでも希望休のあるスタッフは同値類に含めないか"""
+    staffs = _staffs()
+    tasks = [Task(id=1, name="風呂")]
+    days = month_days(2025, 11)
+    model = cp_model.CpModel()
+    shifts = {(s.id, d, 1): model.NewBoolVar("") for s in staffs for d in days}
+    absences = [AbsenceRequest(staff_id=4, date="2025-11-10")]
+
+    constraints = ShiftConstraints(model, shifts, staffs, tasks, days, 2025, 11)
+
+    month_input = MonthInput.from_rows([], absences, [], 2025, 11)
+    assert constraints.add_symmetry_breaking(month_input) == [[1, 2, 3]]
+
+
+def test_symmetry_breaking_orders_interchangeable_staff():
+    """対称性除去の有無で解の有無が変わらず、同値類内が辞書式の降順に並ぶか"""
+    staffs = _staffs()
+    tasks = [Task(id=1, name="風呂"), Task(id=2, name="食事")]
+    reqs = [DailyRequirement(date=f"2025-11-{d:02d}", task_id=1 + d % 2, count=2) for d in range(1, 11)]
+    absences = [AbsenceRequest(staff_id=5, date="2025-11-03")]
+
+    plain = solve_shifts(staffs, tasks, reqs, absences, 2025, 11, symmetry_breaking=False)
+    broken = solve_shifts(staffs, tasks, reqs, absences, 2025, 11, symmetry_breaking=True)
+
+    assert plain.feasible and broken.feasible
+    # (日, 業務) 順の 0/1 列で比較する
+    rows = {
+        row["staffId"]: [row["shifts"][f"2025-11-{d:02d}"] == t.name for d in range(1, 31) for t in tasks]
+        for row in broken.shift_data["by_staff"]
+    }
+    assert rows[1] >= rows[2] >= rows[3] >= rows[4]
@@ -0,0 +1,66 @@
+import datetime
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+
+from backend.crud import crud_shift
+from backend.models.models import AbsenceRequest, DailyRequirement, Holiday, MonthlyRestDaySetting
+from backend.schemas import schemas
+
+
+def test_upserts_use_one_statement_and_keep_one_row_per_key(db, statements):
+    """登録・更新が INSERT ... ON CONFLICT 1文で済み、同じキーで2回呼んでも行が増えないか"""
+    first = crud_shift.upsert_requirement(db, schemas.DailyRequirementCreate(date="2025-11-01", task_id=1, count=2))
+    statements.clear()
+    second = crud_shift.upsert_requirement(db, schemas.DailyRequirementCreate(date="2025-11-01", task_id=1, count=5))
+    assert [s.split()[0] for s in statements] == ["INSERT"]
+    assert second.id == first.id and second.count == 5
+
+    crud_shift.create_holiday(db, schemas.HolidayCreate(date="2025-11-23", description="勤労感謝の日"))
+    holiday = crud_shift.create_holiday(db, schemas.HolidayCreate(date="2025-11-23", description="上書きしない"))
+    assert holiday.description == "勤労感謝の日"
+
+    crud_shift.create_absence(db, schemas.AbsenceRequestCreate(staff_id=1, date="2025-11-05"))
+    absence = crud_shift.create_absence(db, schemas.AbsenceRequestCreate(staff_id=1, date="2025-11-05"))
+    assert absence.date == datetime.date(2025, 11, 5)
+
+    crud_shift.upsert_monthly_rest_setting(db, 2025, 11, 8)
+    setting = crud_shift.upsert_monthly_rest_setting(db, 2025, 11, 9)
+    assert setting.additional_days == 9
+
+    for model in (DailyRequirement, Holiday, AbsenceRequest, MonthlyRestDaySetting):
+        assert db.query(model).count() == 1
+
+
+def test_natural_keys_are_unique(db):
+    """upsert を通さない重複登録も一意制約で拒否されるか"""
+    db.add_all([
+        MonthlyRestDaySetting(year=2025, month=11, additional_days=8),
+        MonthlyRestDaySetting(year=2025, month=11, additional_days=9),
+    ])
+    with pytest.raises(IntegrityError):
+        db.commit()
+    db.rollback()
+
+    day = datetime.date(2025, 11, 5)
+    db.add_all([AbsenceRequest(staff_id=1, date=day), AbsenceRequest(staff_id=1, date=day)])
+    with pytest.raises(IntegrityError):
+        db.commit()
+
+
+def test_unsupported_database_is_rejected_at_startup(engine):
+    """upsert に対応していない DB は、起動時のチェックで分かるか"""
+    crud_shift.check_upsert_support(engine)
+    with pytest.raises(RuntimeError):
+        crud_shift.check_upsert_support(SimpleNamespace(dialect=SimpleNamespace(name="mysql")))
+
+
+def test_invalid_dates_are_validation_errors():
+    """形式違い・存在しない日付・文字列以外の日付を 422 になる ValidationError として拒否するか"""
+    for value in ("2025-11-31", "11/05", 20251105, None):
+        with pytest.raises(ValidationError):
+            schemas.HolidayCreate(date=value, description="x")
+        with pytest.raises(ValidationError):
+            schemas.AbsenceRequestCreate(staff_id=1, date=value)
@@ -89,6 +89,19 @@ export async function bulkApproveDayOffRequests(requestIds, approvedBy) {
   });
 }
 
+// status: 'approved' | 'rejected' | 'pending'。結果は { status, updated_ids, skipped: [{ id, reason, current_status }] }
+export async function bulkUpdateDayOffStatus(requestIds, status, actedBy, rejectionReason = null) {
+  return fetchAPI('/admin/requested-days-off/bulk-status', {
+    method: 'PUT',
+    body: JSON.stringify({
+      request_ids: requestIds,
+      status,
+      acted_by: actedBy,
+      rejection_reason: rejectionReason,
+    }),
+  });
+}
+
 export async function getAdminDayOffCalendar(year, month, includePending = true) {
   return fetchAPI(`/admin/requested-days-off/calendar?year=${year}&month=${month}&include_pending=${includePending}`);
 }
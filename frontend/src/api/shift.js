@@ -35,6 +35,39 @@ export async function createOrUpdateRequirement(requirementData) {
   });
 }
 
+// 対象月に実際に使われる要件（曜日ごとの定型を展開し、日付指定の要件で上書きしたもの）
+export async function getEffectiveRequirements(year, month) {
+  return fetchAPI(`/requirements/effective?year=${year}&month=${month}`);
+}
+
+// 1か月分をまとめて登録・更新する。
+// matrix: { taskId: [1日〜月末の人数] } / weekdayPattern: { taskId: [月〜日の人数] } のどちらか一方
+export async function upsertMonthRequirements(year, month, { matrix = null, weekdayPattern = null }) {
+  return fetchAPI('/requirements/month', {
+    method: 'PUT',
+    body: JSON.stringify({ year, month, matrix, weekday_pattern: weekdayPattern }),
+  });
+}
+
+// 曜日ごとの定型（weekday: 0=月曜 〜 6=日曜）。シフト生成時に対象月へ展開され、日付指定の要件が優先される
+export async function getRequirementTemplates() {
+  return fetchAPI('/requirement-templates');
+}
+
+// weekdayPattern: { taskId: [月〜日の人数（null でその曜日の定型を削除）] }
+export async function setRequirementTemplates(weekdayPattern) {
+  return fetchAPI('/requirement-templates', {
+    method: 'PUT',
+    body: JSON.stringify({ weekday_pattern: weekdayPattern }),
+  });
+}
+
+export async function deleteRequirementTemplates(taskId) {
+  return fetchAPI(`/requirement-templates/${taskId}`, {
+    method: 'DELETE',
+  });
+}
+
 // ========== Holiday API (施設休日) ==========
 
 export async function getHolidays(year, month) {
@@ -56,13 +89,85 @@ export async function deleteHoliday(date) {
 
 // ========== Shift Generation API ==========
 
-export async function generateShift(year, month) {
+const JOB_POLL_INTERVAL_MS = 1000;
+const JOB_FINISHED_STATUSES = ['succeeded', 'failed', 'cancelled'];
+
+export async function submitShiftJob(year, month, options = {}) {
   return fetchAPI('/generate-shift', {
     method: 'POST',
-    body: JSON.stringify({ year, month }),
+    body: JSON.stringify({ year, month, ...options }),
+  });
+}
+
+export async function getShiftJob(jobId) {
+  return fetchAPI(`/generate-shift/${jobId}`);
+}
+
+export async function cancelShiftJob(jobId) {
+  return fetchAPI(`/generate-shift/${jobId}/cancel`, {
+    method: 'POST',
   });
 }
 
+// コンパクト形式の shift_data（staffs / tasks / dates + 業務インデックス行列）を
+// カレンダー用の by_date とテーブル用の by_staff に展開する。通常形式はそのまま返す
+export function expandShiftData(shiftData) {
+  if (!shiftData || shiftData.format !== 'compact') {
+    return shiftData;
+  }
+  const { dates, staffs, tasks, matrix } = shiftData;
+  const byDate = {};
+  const byStaff = staffs.map((staff, staffIdx) => {
+    const shifts = {};
+    dates.forEach((date, dayIdx) => {
+      const taskIdx = matrix[staffIdx][dayIdx];
+      shifts[date] = taskIdx >= 0 ? tasks[taskIdx].name : '';
+    });
+    return { staffId: staff.id, staffName: staff.name, shifts };
+  });
+  // by_date はサーバーと同じく業務順、同じ業務内はスタッフ順に並べる
+  dates.forEach((date, dayIdx) => {
+    const items = [];
+    tasks.forEach((task, taskIdx) => {
+      staffs.forEach((staff, staffIdx) => {
+        if (matrix[staffIdx][dayIdx] === taskIdx) {
+          items.push({
+            staffId: staff.id,
+            staffName: staff.name,
+            taskId: task.id,
+            taskName: task.name,
+            isNurse: staff.isNurse,
+          });
+        }
+      });
+    });
+    if (items.length > 0) {
+      byDate[date] = items;
+    }
+  });
+  return { by_date: byDate, by_staff: byStaff };
+}
+
+// ジョブを登録し、完了するまでポーリングして結果を返す
+// shift_data はコンパクト形式で受け取り、by_date / by_staff に展開して返す
+// options.elastic = true なら不足を許した下書きを返す（不足は job.shortfalls）
+export async function generateShift(year, month, options = {}) {
+  let job = await submitShiftJob(year, month, { compact: true, ...options });
+  while (!JOB_FINISHED_STATUSES.includes(job.status)) {
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    job = await getShiftJob(job.job_id);
+  }
+  if (job.status !== 'succeeded') {
+    // 解なしの場合は原因となった制約を添える
+    const conflicts = (job.conflicts || [])
+      .map((c) => `${c.description}（${c.date || `スタッフID ${c.staff_id}`}）`)
+      .join('、');
+    const message = job.error || 'シフト生成がキャンセルされました';
+    throw new Error(conflicts ? `${message} 原因: ${conflicts}` : message);
+  }
+  return { ...job, shift_data: expandShiftData(job.shift_data) };
+}
+
 // ========== Monthly Rest Day Setting API (月間公休設定) ==========
 
 export async function getMonthlyRestSetting(year, month) {
@@ -2,7 +2,7 @@
 import React, { useState, useEffect } from 'react';
 import { Card, Button } from './ui/Layouts';
 import { getTasks } from '../api/task';
-import { getRequirements, createOrUpdateRequirement } from '../api/shift';
+import { getRequirements, getEffectiveRequirements, createOrUpdateRequirement, upsertMonthRequirements } from '../api/shift';
 import { ClipboardList, Save, Loader2, Info } from 'lucide-react';
 
 // デフォルト要件の人数設定
@@ -21,6 +21,8 @@ const DEFAULT_REQUIREMENTS_MAP = {
 export default function DailyRequirements({ selectedMonth }) {
   const [tasks, setTasks] = useState([]);
   const [requirements, setRequirements] = useState({});
+  // 選択月の実際の要件（定型 + 日付指定の上書き）。日付ごとに { taskId: count }
+  const [effectiveRequirements, setEffectiveRequirements] = useState({});
   const [loading, setLoading] = useState(true);
   const [saving, setSaving] = useState(false);
 
@@ -32,6 +34,12 @@ export default function DailyRequirements({ selectedMonth }) {
     fetchData();
   }, []);
 
+  useEffect(() => {
+    if (selectedMonth) {
+      fetchEffectiveRequirements(selectedMonth);
+    }
+  }, [selectedMonth]);
+
   useEffect(() => {
     // デフォルトの日付を、選択された月の最初の日（1日）に設定
     if (selectedMonth) {
@@ -40,6 +48,30 @@ export default function DailyRequirements({ selectedMonth }) {
     }
   }, [selectedMonth, tasks]); // tasksのロード完了後にも実行されるよう追加
 
+  useEffect(() => {
+    // 実際の要件を読み込み直したら、選択中の日付の表示も更新する
+    if (selectedDate) {
+      handleDateChange(selectedDate);
+    }
+  }, [effectiveRequirements]);
+
+  const fetchEffectiveRequirements = async (yearMonth) => {
+    try {
+      const [year, month] = yearMonth.split('-').map(Number);
+      const data = await getEffectiveRequirements(year, month);
+      const grouped = data.reduce((acc, req) => {
+        if (!acc[req.date]) {
+          acc[req.date] = {};
+        }
+        acc[req.date][req.task_id] = req.count;
+        return acc;
+      }, {});
+      setEffectiveRequirements(grouped);
+    } catch (err) {
+      console.error('Failed to fetch effective requirements:', err);
+    }
+  };
+
   const fetchData = async () => {
     try {
       setLoading(true);
@@ -71,6 +103,9 @@ export default function DailyRequirements({ selectedMonth }) {
     if (requirements[date]) {
       // すでにDBに設定がある場合はそれを表示
       setTaskRequirements(requirements[date]);
+    } else if (effectiveRequirements[date]) {
+      // 日付指定がなく定型がある日は、シフト生成で使われる定型の人数を表示
+      setTaskRequirements(effectiveRequirements[date]);
     } else {
       // 設定がない場合はタスク名からキーワードを探してデフォルト値をセット
       const newDefaults = {};
@@ -105,6 +140,7 @@ export default function DailyRequirements({ selectedMonth }) {
 
       await Promise.all(promises);
       await fetchData();
+      await fetchEffectiveRequirements(selectedDate.slice(0, 7));
       alert('保存しました');
     } catch (err) {
       alert('保存に失敗しました: ' + err.message);
@@ -125,26 +161,15 @@ export default function DailyRequirements({ selectedMonth }) {
     try {
       setSaving(true);
       
-      const datesToUpdate = [];
-      for (let d = 1; d <= lastDay; d++) {
-        datesToUpdate.push(`${year}-${String(month).padStart(2, '0')}-${String(d).padStart(2, '0')}`);
-      }
-
-      const allPromises = [];
-      datesToUpdate.forEach(date => {
-        Object.entries(taskRequirements).forEach(([taskId, count]) => {
-          allPromises.push(
-            createOrUpdateRequirement({
-              date: date,
-              task_id: parseInt(taskId),
-              count: count === '' ? 0 : parseInt(count) || 0,
-            })
-          );
-        });
+      // 全曜日に同じ人数を指定し、1回のリクエストで月全体に適用
+      const weekdayPattern = {};
+      Object.entries(taskRequirements).forEach(([taskId, count]) => {
+        weekdayPattern[taskId] = Array(7).fill(count === '' ? 0 : parseInt(count) || 0);
       });
 
-      await Promise.all(allPromises);
+      await upsertMonthRequirements(year, month, { weekdayPattern });
       await fetchData();
+      await fetchEffectiveRequirements(selectedDate.slice(0, 7));
       alert(`${month}月の全日程に適用を完了しました`);
     } catch (err) {
       alert('一括保存に失敗しました: ' + err.message);
@@ -203,6 +228,9 @@ export default function DailyRequirements({ selectedMonth }) {
         <>
           <p className="text-sm text-gray-600 mb-3 font-medium">
             {formatDate(selectedDate)} の要件:
+            {!requirements[selectedDate] && effectiveRequirements[selectedDate] && (
+              <span className="ml-2 text-xs text-gray-500">（曜日ごとの定型）</span>
+            )}
           </p>
 
           {tasks.length === 0 ? (